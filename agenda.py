@@ -0,0 +1,163 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+# --------------------------------------------------
+# AGENDADOR DE ENVIO (RAIAS DE PRIORIDADE)
+# O worker envia uma mensagem por vez e, a cada mensagem,
+# pega o job pronto da raia mais prioritária:
+#   URGENTE  coletas Arcos (malote no mesmo dia)
+#   NORMAL   solicitação de NF, pré alerta de coleta
+#   MASSA    avisos de status por unidade
+# Assim um alerta urgente entra entre duas mensagens de
+# um envio em massa, sem esperar ele terminar.
+#
+# Cada raia é um heap (pronto_em, ordem, job_id):
+#   - "pronto_em" vem do agendamento (início), da pausa /
+#     espalhamento entre mensagens do job e da espera
+#     por cota das contas
+#   - raia MASSA só envia dentro de AUTOMAILER_JANELA_MASSA
+#     ("07:00-19:00", "20:00-06:00" vira a noite;
+#     vazio = qualquer horário)
+# --------------------------------------------------
+URGENTE = 0
+NORMAL = 1
+MASSA = 2
+
+NOMES_RAIAS = {
+    URGENTE: "urgente",
+    NORMAL: "normal",
+    MASSA: "massa",
+}
+
+
+def _ler_janela(texto):
+    if not texto.strip():
+        return None
+
+    inicio, fim = (
+        datetime.strptime(parte.strip(), "%H:%M").time()
+        for parte in texto.split("-")
+    )
+    return inicio, fim
+
+
+JANELA_MASSA = _ler_janela(os.environ.get("AUTOMAILER_JANELA_MASSA", ""))
+
+_raias = {prioridade: [] for prioridade in NOMES_RAIAS}
+_ordem = itertools.count()
+_cond = threading.Condition()
+
+
+# --------------------------------------------------
+# JANELA DE ENVIO
+# --------------------------------------------------
+def dentro_da_janela(prioridade, quando):
+    # quando (epoch) ajustado para o próximo horário permitido
+    if prioridade != MASSA or JANELA_MASSA is None:
+        return quando
+
+    inicio, fim = JANELA_MASSA
+    momento = datetime.fromtimestamp(quando)
+    hora = momento.time()
+
+    if inicio < fim:
+        aberta = inicio <= hora < fim
+    else:
+        # janela que vira a noite ("20:00-06:00");
+        # início == fim é o dia inteiro
+        aberta = hora >= inicio or hora < fim
+
+    if aberta:
+        return quando
+
+    # fechada: próxima abertura, hoje ou amanhã
+    proximo = datetime.combine(momento.date(), inicio)
+    if proximo <= momento:
+        proximo += timedelta(days=1)
+
+    return proximo.timestamp()
+
+
+# --------------------------------------------------
+# FILA
+# --------------------------------------------------
+def agendar(job_id, prioridade, quando=None):
+    quando = dentro_da_janela(prioridade, quando or time.time())
+
+    with _cond:
+        heapq.heappush(_raias[prioridade], (quando, next(_ordem), job_id))
+        _cond.notify()
+
+    return quando
+
+
+def proximo():
+    # bloqueia até algum job ter mensagem pronta;
+    # raia mais prioritária primeiro
+    with _cond:
+        while True:
+            agora = time.time()
+
+            for prioridade in sorted(_raias):
+                raia = _raias[prioridade]
+                if raia and raia[0][0] <= agora:
+                    return heapq.heappop(raia)[2]
+
+            proximos = [raia[0][0] for raia in _raias.values() if raia]
+            _cond.wait(timeout=min(proximos) - agora if proximos else None)
+
+
+def pendentes():
+    with _cond:
+        return {
+            NOMES_RAIAS[prioridade]: len(raia)
+            for prioridade, raia in _raias.items()
+        }
+
+
+# --------------------------------------------------
+# FORMULÁRIO (UI)
+# --------------------------------------------------
+def opcoes_agendamento(chave):
+    # → (início como epoch ou None, minutos de espalhamento)
+    with st.expander("⏰ Agendamento"):
+        agendar_envio = st.checkbox(
+            "Agendar início do envio",
+            key=f"{chave}_agendar"
+        )
+
+        inicio = None
+        if agendar_envio:
+            col_data, col_hora = st.columns(2)
+
+            with col_data:
+                data = st.date_input(
+                    "Data", format="DD/MM/YYYY", key=f"{chave}_agendar_data"
+                )
+
+            with col_hora:
+                hora = st.time_input("Hora", key=f"{chave}_agendar_hora")
+
+            inicio = datetime.combine(data, hora).timestamp()
+
+        espalhar_min = st.number_input(
+            "Espalhar o envio ao longo de (minutos, 0 = sem espalhar)",
+            min_value=0,
+            max_value=24 * 60,
+            step=5,
+            key=f"{chave}_espalhar"
+        )
+
+        if JANELA_MASSA:
+            st.caption(
+                "Envios em massa só saem entre "
+                f"{JANELA_MASSA[0]:%H:%M} e {JANELA_MASSA[1]:%H:%M}."
+            )
+
+    return inicio, int(espalhar_min)
@@ -0,0 +1,122 @@
+import functools
+import os
+import re
+import zipfile
+
+# --------------------------------------------------
+# PDFs DA COLETA (SOLTOS OU EM .ZIP)
+# O .zip não é extraído: só o diretório central é lido
+# na indexação e cada PDF é lido do arquivo só quando a
+# mensagem da unidade é enviada (com a fila, quando o
+# job é gravado nela).
+#
+# Casamento nome do arquivo → ORDEM tolerante a:
+#   - maiúsculas / minúsculas, ".PDF", pastas no .zip
+#   - ORDEM lida como número ("123.0") e zeros à esquerda
+#   - sufixos conhecidos ("123_assinado", "123 (1)", "123-2"),
+#     listados na conferência para o operador confirmar
+# Outro texto depois do número ("2024-01-15 relatorio")
+# não casa: PDF alheio não vai para unidade externa.
+# --------------------------------------------------
+MAX_PDF_MB = 50
+
+ORDEM_NUMERICA = re.compile(r"^0*(\d+)(?:\.0+)?$")
+ORDEM_COM_SUFIXO = re.compile(r"^0*(\d+)(?:_ASSINADO)?(?: ?\(\d+\)|-\d+)?$")
+
+
+def chave_ordem(valor):
+    texto = str(valor).strip().upper()
+
+    numero = ORDEM_NUMERICA.match(texto)
+    return numero.group(1) if numero else texto
+
+
+def _chaves_arquivo(nome):
+    # (chave exata, chave pelo número antes do sufixo conhecido)
+    base = os.path.splitext(os.path.basename(nome))[0].strip().upper()
+
+    sufixo = ORDEM_COM_SUFIXO.match(base)
+    return chave_ordem(base), sufixo.group(1) if sufixo else None
+
+
+# --------------------------------------------------
+# INDEXAÇÃO
+# anexo = (nome, ler) → ler() devolve os bytes do PDF
+# --------------------------------------------------
+def indexar(arquivos):
+    anexos = []
+    ignorados = []
+
+    for arquivo in arquivos:
+        nome = arquivo.name
+
+        if nome.lower().endswith(".zip"):
+            try:
+                pacote = zipfile.ZipFile(arquivo)
+            except zipfile.BadZipFile:
+                ignorados.append((nome, "zip inválido"))
+                continue
+
+            for info in pacote.infolist():
+                membro = info.filename
+
+                if info.is_dir() or membro.startswith("__MACOSX/"):
+                    continue
+
+                if not membro.lower().endswith(".pdf"):
+                    ignorados.append((f"{nome}/{membro}", "não é PDF"))
+                    continue
+
+                if info.file_size > MAX_PDF_MB * 1024 * 1024:
+                    ignorados.append((f"{nome}/{membro}", f"acima de {MAX_PDF_MB} MB"))
+                    continue
+
+                anexos.append((
+                    os.path.basename(membro),
+                    functools.partial(pacote.read, info)
+                ))
+
+        elif nome.lower().endswith(".pdf"):
+            anexos.append((os.path.basename(nome), arquivo.getvalue))
+
+        else:
+            ignorados.append((nome, "não é PDF"))
+
+    return anexos, ignorados
+
+
+# --------------------------------------------------
+# CASAMENTO COM AS ORDENS DA PLANILHA
+# → {ordem: [anexos]}, PDFs sem ordem, ordens sem PDF,
+#   [(PDF, ordem)] casados pelo sufixo (para conferência)
+# --------------------------------------------------
+def casar(ordens, anexos):
+    ordens = list(dict.fromkeys(ordens))
+
+    por_chave = {}
+    for ordem in ordens:
+        por_chave.setdefault(chave_ordem(ordem), []).append(ordem)
+
+    mapa = {}
+    sem_ordem = []
+    por_sufixo = []
+
+    for anexo in anexos:
+        exata, numero = _chaves_arquivo(anexo[0])
+
+        destino = por_chave.get(exata)
+        if not destino and por_chave.get(numero):
+            destino = por_chave[numero]
+            por_sufixo.extend((anexo[0], ordem) for ordem in destino)
+
+        if not destino:
+            sem_ordem.append(anexo[0])
+            continue
+
+        # grafias da mesma ORDEM ("123" / "0123"): todas recebem o PDF
+        for ordem in destino:
+            mapa.setdefault(ordem, []).append(anexo)
+
+    sem_pdf = [ordem for ordem in ordens if ordem not in mapa]
+
+    return mapa, sorted(sem_ordem), sem_pdf, sorted(por_sufixo)
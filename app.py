@@ -1,8 +1,8 @@
 import streamlit as st
-import pandas as pd
-import smtplib
-from email.mime.text import MIMEText
-import time
+
+import envio
+import perfil
+import remetentes
 
 # --------------------------------------------------
 # CONFIG STREAMLIT
@@ -14,23 +14,6 @@ st.set_page_config(
 
 st.title("📮 Envio Automático de E-mails")
 
-# --------------------------------------------------
-# BASE DE E-MAILS DAS UNIDADES
-# A = Unidade | B = Emails
-# --------------------------------------------------
-@st.cache_data
-def carregar_emails_unidades():
-    df = pd.read_excel("emails_unidades.xlsx", header=0)
-    df.columns = ["Unidade", "Emails"]
-
-    df["Unidade"] = df["Unidade"].astype(str).str.strip().str.upper()
-    df["Emails"] = df["Emails"].astype(str).str.strip()
-
-    return dict(zip(df["Unidade"], df["Emails"]))
-
-
-emails_unidades = carregar_emails_unidades()
-
 # --------------------------------------------------
 # FORMULÁRIO
 # --------------------------------------------------
@@ -49,6 +32,9 @@ with col_form:
         key="email_smtp"
     )
 
+    # pool de remetentes: soma a cota de envio das contas
+    with st.expander("👥 Contas adicionais de envio"):
+        remetentes.formulario_contas()
 
     uploaded = st.file_uploader(
     "Importar arquivos",
@@ -56,23 +42,54 @@ with col_form:
     accept_multiple_files=True
 )
 
+# perfilamento sob demanda (cProfile + flame graph)
+perfil.controle()
+
+# --------------------------------------------------
+# ENVIOS EM ANDAMENTO
+# --------------------------------------------------
+envio.painel_jobs(email_user, senha)
+perfil.mostrar_perfis()
+
 # --------------------------------------------------
 # PROCESSAMENTO DA PLANILHA
 # --------------------------------------------------
 if uploaded:
 
+    # pandas, leitores do Excel e diretórios de e-mail só
+    # são carregados quando existe arquivo para processar
+    import memoria
+    from leitura import detectar_fluxo
+
+    memoria.registrar_uploads(uploaded)
+
+    assinatura_upload = tuple(
+        (file.name, file.size, getattr(file, "file_id", ""))
+        for file in uploaded
+    )
+
+    # txt → pedidos; A1 == "RE" → arcos; A2 == "ORDEM" → coleta
+    # (mesma detecção do vigia.py), uma vez por upload: trocar
+    # filtro não relê o cabeçalho da planilha
+    if st.session_state.get("fluxo_assinatura") != assinatura_upload:
+        st.session_state["fluxo_detectado"] = detectar_fluxo(uploaded)
+        st.session_state["fluxo_assinatura"] = assinatura_upload
+
+    fluxo = st.session_state["fluxo_detectado"]
+
     # ==================================================
     # FLUXO TXT (PEDIDOS / EVELOG)
     # Se TODOS os arquivos forem .txt
     # ==================================================
-    if all(file.name.lower().endswith(".txt") for file in uploaded):
+    if fluxo == "pedidos":
 
         import pedidos_txt
-        pedidos_txt.run(
-            arquivos=uploaded,
-            email_user=email_user,
-            senha=senha
-        )
+        with perfil.perfilar("pedidos_txt"):
+            pedidos_txt.run(
+                arquivos=uploaded,
+                email_user=email_user,
+                senha=senha
+            )
         st.stop()
 
     # ==================================================
@@ -81,144 +98,179 @@ if uploaded:
     # ==================================================
     first_file = uploaded[0]
 
-    if first_file.name.endswith(".csv"):
-        df_check = pd.read_csv(first_file, header=None, nrows=1)
-    else:
-        df_check = pd.read_excel(first_file, header=None, nrows=1)
-
-    primeira_celula = str(df_check.iloc[0, 0]).strip().upper()
-
-    if primeira_celula == "RE":
+    if fluxo == "arcos":
 
         import coletasArcos
-        coletasArcos.run(
-            arquivo=first_file,
-            email_user=email_user,
-            senha=senha
-        )
+        with perfil.perfilar("coletasArcos"):
+            coletasArcos.run(
+                arquivo=first_file,
+                email_user=email_user,
+                senha=senha
+            )
         st.stop()
 
     # ==================================================
     # DETECÇÃO DE PLANILHA DE COLETA
     # (A2 == "ORDEM") → usa SOMENTE o primeiro arquivo
     # ==================================================
-    first_file = uploaded[0]
-
-    if first_file.name.endswith(".csv"):
-        df_head = pd.read_csv(first_file, header=1, usecols=[0], nrows=1)
-    else:
-        df_head = pd.read_excel(first_file, header=1, usecols=[0], nrows=1)
-
-    primeira_coluna = str(df_head.columns[0]).strip().upper()
-
-    if primeira_coluna == "ORDEM":
-
-        # leitura completa do primeiro arquivo
-        if first_file.name.endswith(".csv"):
-            df = pd.read_csv(first_file, header=1)
-        else:
-            df = pd.read_excel(first_file, header=1)
+    if fluxo == "coleta":
 
         import coleta
-        coleta.run(df)
+        import esquemas
+        with perfil.perfilar("coleta"):
+            # leitura completa do primeiro arquivo
+            try:
+                df = esquemas.ler_por_nome(first_file, esquemas.COLETA)
+            except esquemas.LayoutInvalido as e:
+                st.error(f"❌ {e}")
+                st.stop()
+            coleta.run(df)
         st.stop()
 
     # ==================================================
     # FLUXO NORMAL (APP ATUAL)
     # → unifica todas as planilhas
+    # A leitura, a normalização e o índice de status são
+    # feitos uma vez por upload; trocar o filtro reaproveita.
     # ==================================================
-    dfs = []
+    from destinatarios import mostrar_problemas_diretorio
+    from diretorios import (
+        ARQUIVO_UNIDADES,
+        carregar_emails_unidades,
+        problemas_diretorio,
+    )
+    from indice import descricoes_do_status, posicoes_do_status, status_disponiveis
+    import agenda
+    import delta
+    import esquemas
+    import fluxo_status
+    import previa
+
+    # sessão esquecida pela memoria.py (aba parada há mais
+    # de VALIDADE_SPILL_S) perde os itens: lê de novo
+    if (
+        st.session_state.get("upload_assinatura") != assinatura_upload
+        or memoria.obter("upload_indice") is None
+    ):
+
+        with perfil.perfilar("leitura_status"):
+            try:
+                df = fluxo_status.ler_exportacoes(uploaded)
+            except esquemas.LayoutInvalido as e:
+                st.error(f"❌ {e}")
+                st.stop()
+            indice = fluxo_status.indexar(df)
 
-    for i, file in enumerate(uploaded):
+        st.session_state["upload_assinatura"] = assinatura_upload
+        memoria.guardar("upload_df", df)
+        memoria.guardar("upload_indice", indice)
 
-        if i == 0:
-            # Primeiro arquivo DEFINE o cabeçalho (linha 2)
-            if file.name.endswith(".csv"):
-                df = pd.read_csv(file, header=1)
-            else:
-                df = pd.read_excel(file, header=1)
-
-            colunas = df.columns  # guarda o layout correto
-
-        else:
-            # Demais arquivos:
-            # pula 2 linhas e USA o mesmo cabeçalho do primeiro
-            if file.name.endswith(".csv"):
-                df = pd.read_csv(
-                    file,
-                    skiprows=2,
-                    header=None,
-                    names=colunas
+    df = memoria.obter("upload_df")
+    indice = memoria.obter("upload_indice")
+    memoria.mostrar_uso()
+
+    # --------------------------------------------------
+    # SELETOR DE STATUS
+    # --------------------------------------------------
+    st.markdown("---")
+    st.subheader("📌 Filtro de status")
+
+    # modo resumo: vários status num único e-mail por unidade,
+    # uma seção por status (em vez de um envio por status)
+    modo_resumo = st.checkbox(
+        "📚 Modo resumo (vários status em um e-mail por unidade)"
+    )
+
+    if modo_resumo:
+        status_selecionados = st.multiselect(
+            "Selecione os status do resumo",
+            status_disponiveis(indice)
+        )
+    else:
+        status_selecionados = [
+            st.selectbox(
+                "Selecione o status para envio",
+                status_disponiveis(indice)
+            )
+        ]
+
+    filtros = []
+
+    for status_selecionado in status_selecionados:
+
+        descricoes_selecionadas = None
+
+        # --------------------------------------------------
+        # REGRA ESPECIAL – CUSTODIA
+        # --------------------------------------------------
+        if "CUSTODIA" in status_selecionado:
+
+            descricoes = [
+                d for d in descricoes_do_status(indice, status_selecionado)
+                if d and d != "NAN"
+            ]
+
+            if modo_resumo:
+                descricoes_selecionadas = st.multiselect(
+                    f"Descrições da custódia ({status_selecionado})",
+                    descricoes,
+                    default=descricoes
                 )
             else:
-                df = pd.read_excel(
-                    file,
-                    skiprows=2,
-                    header=None,
-                    names=colunas
+                descricao_selecionada = st.selectbox(
+                    "Selecione a descrição da custódia",
+                    descricoes
                 )
 
-        dfs.append(df)
-
-    df = pd.concat(dfs, ignore_index=True)
+                descricoes_selecionadas = [descricao_selecionada]
 
-    # -----------------------------
-    # COLUNAS FIXAS
-    # -----------------------------
-    COL_UNIDADE = df.columns[6]   # G
-    COL_STATUS  = df.columns[14]  # O
+        filtros.append((status_selecionado, descricoes_selecionadas))
 
-    COL_DESCRICAO_STATUS = df.columns[18]  # coluna S
+    grupos = fluxo_status.secoes_por_unidade(df, indice, filtros)
 
-    df[COL_UNIDADE] = df[COL_UNIDADE].astype(str).str.strip().str.upper()
-    df[COL_STATUS] = df[COL_STATUS].astype(str).str.strip().str.upper()
-    df[COL_DESCRICAO_STATUS] = df[COL_DESCRICAO_STATUS].astype(str).str.strip().str.upper()
-    df[COL_DESCRICAO_STATUS] = (df[COL_DESCRICAO_STATUS].astype(str).str.strip().str.upper())
+    if not grupos:
+        st.warning("Nenhum registro encontrado para o filtro selecionado.")
+        st.stop()
 
     # --------------------------------------------------
-    # SELETOR DE STATUS
+    # MODO DELTA
+    # só unidades cuja tabela mudou desde o último envio
     # --------------------------------------------------
-    st.markdown("---")
-    st.subheader("📌 Filtro de status")
-
-    status_disponiveis = sorted(df[COL_STATUS].dropna().unique())
-
-    status_selecionado = st.selectbox(
-        "Selecione o status para envio",
-        status_disponiveis
+    somente_alteradas = st.checkbox(
+        "🔁 Enviar só para unidades com alterações desde o último envio"
     )
 
-    df_filtrado = df[df[COL_STATUS] == status_selecionado]
+    if somente_alteradas:
 
-    # --------------------------------------------------
-    # REGRA ESPECIAL – CUSTODIA
-    # --------------------------------------------------
-    if "CUSTODIA" in status_selecionado:
+        col_unidade = df.columns[fluxo_status.POS_UNIDADE]
+        alteradas = set()
 
-        descricoes = (
-            df_filtrado[COL_DESCRICAO_STATUS]
-            .dropna()
-            .unique()
-            .tolist()
-        )
+        for status_selecionado, descricoes_selecionadas in filtros:
 
-        descricoes = sorted([d for d in descricoes if d and d != "NAN"])
+            linhas = df.iloc[
+                posicoes_do_status(indice, status_selecionado, descricoes_selecionadas)
+            ]
+            alteradas_status, contagem = delta.unidades_alteradas(
+                status_selecionado, linhas, col_unidade
+            )
 
-        descricao_selecionada = st.selectbox(
-            "Selecione a descrição da custódia",
-            descricoes
-        )
+            st.caption(
+                f"**{status_selecionado}** · "
+                + " · ".join(f"{nome}: {qtd}" for nome, qtd in contagem.items())
+            )
 
-        df_filtrado = df_filtrado[
-            df_filtrado[COL_DESCRICAO_STATUS] == descricao_selecionada
-        ]
+            alteradas |= alteradas_status
 
+        grupos = [
+            (unidade, secoes) for unidade, secoes in grupos
+            if unidade in alteradas
+        ]
 
-    if df_filtrado.empty:
-        st.warning("Nenhum registro encontrado para o filtro selecionado.")
-        st.stop()
+        if not grupos:
+            st.info("Nenhuma unidade com alterações desde o último envio.")
+            st.stop()
 
-    grupos = df_filtrado.groupby(COL_UNIDADE)
+        st.caption(f"🏢 Unidades com alterações: {len(grupos)}")
 
     # --------------------------------------------------
     # CONFIGURAÇÃO DO E-MAIL
@@ -226,11 +278,18 @@ if uploaded:
     st.markdown("---")
     st.subheader("✉️ Configuração do e-mail")
 
+    mostrar_problemas_diretorio(
+        problemas_diretorio(ARQUIVO_UNIDADES), ARQUIVO_UNIDADES
+    )
+
     cc_input = st.text_input(
         "CC (separados por vírgula)",
         placeholder="email1@evelog.com.br, email2@evelog.com.br"
     )
 
+    cc_resumo, anexar_eml = envio.opcoes_copia("status")
+    inicio, espalhar_min = agenda.opcoes_agendamento("status")
+
     assunto = st.text_input(
         "Assunto",
         placeholder="Assunto do e-mail"
@@ -242,8 +301,35 @@ if uploaded:
         height=150
     )
 
+    # --------------------------------------------------
+    # PRÉVIA
+    # só a página visível é renderizada; o envio reaproveita
+    # --------------------------------------------------
+    secoes_da_unidade = dict(grupos)
+
+    htmls = previa.cache_renders(
+        "status",
+        (
+            assinatura_upload,
+            tuple((s, d if d is None else tuple(d)) for s, d in filtros),
+            texto_base,
+            modo_resumo
+        )
+    )
+
+    previa.mostrar_previa(
+        "status",
+        list(secoes_da_unidade),
+        lambda unidade: fluxo_status.corpo_unidade(
+            texto_base, secoes_da_unidade[unidade], modo_resumo
+        ),
+        htmls,
+        carregar_emails_unidades()
+    )
+
     # --------------------------------------------------
     # ENVIO
+    # monta as mensagens e entrega para o worker
     # --------------------------------------------------
     if st.button("🚀 Enviar e-mails por unidade"):
 
@@ -264,198 +350,41 @@ if uploaded:
         if email_user not in cc_list:
             cc_list.append(email_user)
 
-        log_envio = []
-        sem_email = []
-        falhas_envio = []
-
-        total_grupos = len(grupos)
-        emails_enviados = 0
-
-        progress_bar = st.progress(0)
-        contador_placeholder = st.empty()
-
-        with st.spinner("📨 Enviando e-mails..."):
-
-            try:
-                with smtplib.SMTP_SSL("email-ssl.com.br", 465) as smtp:
-                    smtp.login(email_user, senha)
-
-                    for unidade, pedidos_unidade in grupos:
-
-                        emails_raw = emails_unidades.get(unidade)
-
-                        if not emails_raw:
-                            sem_email.append(unidade)
-                            continue
-
-                        emails_to = [e.strip() for e in emails_raw.split(",") if e.strip()]
-
-                        texto_html = texto_base.replace("\n", "<br>")
-
-                        # -----------------------------
-                        # TABELA DO E-MAIL
-                        # A,B,C,D,G,H,J,O,Q,R
-                        # -----------------------------
-                        if "CUSTODIA" in status_selecionado:
-                            tabela = pedidos_unidade.iloc[
-                                :, [0,1,2,3,6,7,9,14,16,17,18]
-                            ]
-
-                            tabela.columns = [
-                                "Codigo",
-                                "Nota Fiscal",
-                                "Pedido",
-                                "Cliente",
-                                "Destino",
-                                "Cidade",
-                                "UF",
-                                "Status",
-                                "Dt Evento",
-                                "Previsao",
-                                "Descrição"
-                            ]
-                        else:
-                            tabela = pedidos_unidade.iloc[
-                                :, [0,1,2,3,6,7,9,14,16,17]
-                            ]
-
-                            tabela.columns = [
-                                "Codigo",
-                                "Nota Fiscal",
-                                "Pedido",
-                                "Cliente",
-                                "Destino",
-                                "Cidade",
-                                "UF",
-                                "Status",
-                                "Dt Evento",
-                                "Previsao"
-                            ]
-
-                        tabela_html = tabela.to_html(index=False, border=1)
-
-                        corpo_html = f"""
-                        <p>{texto_html}</p>
-                        {tabela_html}
-                        <p><strong><u>SE NÃO ESTIVER NA SUA UNIDADE, FAVOR DESCONSIDERAR.</u></strong></p>
-                        <p><i>Mensagem automática.</i></p>
-                        """
-
-                        msg = MIMEText(corpo_html, "html")
-                        msg["From"] = email_user
-                        msg["To"] = ", ".join(emails_to)
-                        msg["Subject"] = f"{assunto} – Unidade {unidade}"
-                        msg["Cc"] = ", ".join(cc_list)
-
-                        enviado = False
-                        tentativas = 3
-
-                        for tentativa in range(tentativas):
-
-                            try:
-
-                                smtp.send_message(
-                                    msg,
-                                    to_addrs=emails_to + cc_list
-                                )
-
-                                enviado = True
-
-                                break
-
-                            except Exception as erro_envio:
-
-                                st.warning(
-                                    f"""
-                                    Tentativa {tentativa + 1}/{tentativas}
-                                    falhou para unidade {unidade}
-                                    """
-                                )
-
-                                st.write(str(erro_envio))
-
-                                # espera antes de tentar novamente
-                                time.sleep(5 * (tentativa + 1))
-
-                                # reconecta SMTP
-                                try:
-                                    smtp.quit()
-                                except:
-                                    pass
-
-                                smtp = smtplib.SMTP_SSL("email-ssl.com.br", 465)
-                                smtp.login(email_user, senha)
-
-                        # ------------------------------------------------
-                        # SE ENVIOU
-                        # ------------------------------------------------
-                        if enviado:
-
-                            # evita sobrecarregar SMTP
-                            time.sleep(2)
-
-                            emails_enviados += 1
-
-                            # reconecta a cada 20 envios
-                            if emails_enviados % 20 == 0:
-
-                                smtp.quit()
-
-                                smtp = smtplib.SMTP_SSL("email-ssl.com.br", 465)
-                                smtp.login(email_user, senha)
-
-                            percentual = int((emails_enviados / total_grupos) * 100)
-                            progress_bar.progress(percentual)
-
-                            contador_placeholder.markdown(
-                                f"""
-                                **📧 E-mails enviados:** {emails_enviados}  
-                                **🏢 Unidades acionadas:** {emails_enviados} / {total_grupos}
-                                """
-                            )
-
-                            log_envio.append({
-                                "Unidade": unidade,
-                                "Status": status_selecionado,
-                                "Qtd registros": len(pedidos_unidade),
-                                "Para": ", ".join(emails_to),
-                                "CC": ", ".join(cc_list)
-                            })
-
-                        # ------------------------------------------------
-                        # SE FALHOU TODAS
-                        # ------------------------------------------------
-                        else:
-
-                            st.error(
-                                f"""
-                                ❌ Falha definitiva no envio
-                                para unidade {unidade}
-                                """
-                            )
-
-                            falhas_envio.append({
-                                "Unidade": unidade,
-                                "Erro": str(erro_envio)
-                            })
-
-
-                st.success(f"✅ {len(log_envio)} e-mails enviados com sucesso!")
-
-                if log_envio:
-                    st.subheader("📄 Log de envio")
-                    st.dataframe(pd.DataFrame(log_envio))
-
-                if sem_email:
-                    st.warning("⚠️ Unidades sem e-mail cadastrado:")
-                    st.write(sem_email)
-                
-                if falhas_envio:
-
-                    st.error("❌ Unidades com falha no envio")
-                    st.dataframe(
-                        pd.DataFrame(falhas_envio)
-                    )
+        with perfil.perfilar("montagem_status"):
+            mensagens, sem_email = fluxo_status.montar_mensagens(
+                grupos,
+                carregar_emails_unidades(),
+                assunto,
+                texto_base,
+                cc_list,
+                resumo=modo_resumo,
+                htmls=htmls
+            )
+
+            job_id = envio.enfileirar(
+                descricao=f"{assunto} ({', '.join(status_selecionados)})",
+                email_user=email_user,
+                senha=senha,
+                mensagens=mensagens,
+                sem_email=sem_email,
+                # evita sobrecarregar SMTP
+                pausa=2,
+                contas_extras=remetentes.contas_extras_da_sessao(),
+                cc_resumo=cc_resumo,
+                anexar_eml=anexar_eml,
+                prioridade=agenda.MASSA,
+                inicio=inicio,
+                espalhar_min=espalhar_min,
+                # foto de cada status: base do próximo delta,
+                # gravada só para as unidades entregues
+                antes_de_enviar=lambda job_id: delta.registrar_pendente(
+                    job_id,
+                    {
+                        status: df.iloc[posicoes_do_status(indice, status, descricoes)]
+                        for status, descricoes in filtros
+                    },
+                    df.columns[fluxo_status.POS_UNIDADE]
+                )
+            )
 
-            except Exception as e:
-                st.error(f"Erro de conexão SMTP: {e}")
+        envio.registrar_job_na_sessao(job_id)
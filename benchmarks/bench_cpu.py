@@ -0,0 +1,189 @@
+# --------------------------------------------------
+# BENCHMARK DE CPU (LEITURA E RENDERIZAÇÃO)
+# Mede, com arquivos do gerador.py:
+#   - pedidos_txt.parse_txt
+#   - fluxo normal: concat/normalização de várias
+#     exportações, índice de status e agrupamento
+#   - renderização da tabela HTML de cada unidade
+#
+# Os tempos são comparados com benchmarks/baseline_cpu.json;
+# caso mais lento que a tolerância → sai com código 1.
+#
+# Uso:
+#   python benchmarks/bench_cpu.py                  compara com o baseline
+#   python benchmarks/bench_cpu.py --salvar         grava novo baseline
+#   python benchmarks/bench_cpu.py --tolerancia 0.5
+# --------------------------------------------------
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import fluxo_status  # noqa: E402
+from pedidos_txt import parse_txt  # noqa: E402
+
+import gerador  # noqa: E402
+
+BASELINE = os.path.join(RAIZ, "benchmarks", "baseline_cpu.json")
+
+
+# --------------------------------------------------
+# CASOS
+# cada caso prepara os dados uma vez e devolve
+# (nome, medir) — só medir() entra no cronômetro
+# --------------------------------------------------
+def caso_parse_txt(linhas):
+    conteudo = gerador.txt_pedidos(linhas)
+
+    def medir():
+        parse_txt(gerador.Upload(conteudo, "pedidos.txt"))
+
+    return f"parse_txt {linhas} linhas", medir
+
+
+def caso_exportacoes(linhas, arquivos, formato):
+    conteudos = [
+        gerador.exportacao_tms(linhas // arquivos, formato, semente=i)
+        for i in range(arquivos)
+    ]
+
+    def medir():
+        fluxo_status.ler_exportacoes([
+            gerador.Upload(c, f"tms_{i}.{formato}")
+            for i, c in enumerate(conteudos)
+        ])
+
+    return f"ler_exportacoes {arquivos} {formato} {linhas} linhas", medir
+
+
+def _upload_status(linhas):
+    df = fluxo_status.ler_exportacoes([
+        gerador.Upload(gerador.exportacao_tms(linhas, "csv"), "tms.csv")
+    ])
+    return df, fluxo_status.indexar(df)
+
+
+def caso_indice(linhas):
+    df, _ = _upload_status(linhas)
+
+    def medir():
+        fluxo_status.indexar(df)
+
+    return f"indexar {linhas} linhas", medir
+
+
+def caso_agrupamento(linhas):
+    df, indice = _upload_status(linhas)
+    filtros = [(s, None) for s in gerador.STATUS_TMS]
+
+    def medir():
+        fluxo_status.secoes_por_unidade(df, indice, filtros)
+
+    return f"secoes_por_unidade {linhas} linhas", medir
+
+
+def caso_renderizacao(linhas, resumo):
+    df, indice = _upload_status(linhas)
+    filtros = [("EM ROTA", None), ("CUSTODIA", None)] if resumo else [("EM ROTA", None)]
+    grupos = fluxo_status.secoes_por_unidade(df, indice, filtros)
+
+    def medir():
+        for _, secoes in grupos:
+            fluxo_status.corpo_unidade("Segue a relação.\nObrigado.", secoes, resumo)
+
+    modo = "resumo" if resumo else "simples"
+    return f"corpo_unidade {modo} {linhas} linhas", medir
+
+
+def casos(linhas):
+    return [
+        caso_parse_txt(linhas),
+        caso_exportacoes(linhas, 3, "xlsx"),
+        caso_exportacoes(linhas, 3, "csv"),
+        caso_indice(linhas),
+        caso_agrupamento(linhas),
+        caso_renderizacao(linhas, resumo=False),
+        caso_renderizacao(linhas, resumo=True),
+    ]
+
+
+# --------------------------------------------------
+# MEDIÇÃO / BASELINE
+# --------------------------------------------------
+def cronometrar(medir, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        medir()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def ambiente():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "maquina": platform.machine(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[20000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--salvar", action="store_true")
+    args = parser.parse_args()
+
+    tempos = {}
+    for linhas in args.linhas:
+        for nome, medir in casos(linhas):
+            tempos[nome] = round(cronometrar(medir, args.repeticoes), 4)
+
+    if args.salvar:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump({"ambiente": ambiente(), "tempos": tempos}, f, indent=2)
+        print(pd.Series(tempos, name="segundos").to_string())
+        print(f"\nbaseline gravado em {BASELINE}")
+        return
+
+    base = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            gravado = json.load(f)
+        base = gravado["tempos"]
+
+        if gravado.get("ambiente") != ambiente():
+            print(f"aviso: baseline de outro ambiente {gravado.get('ambiente')}")
+    else:
+        print("aviso: sem baseline, rode com --salvar")
+
+    resultados = []
+    for nome, segundos in tempos.items():
+        anterior = base.get(nome)
+        razao = segundos / anterior if anterior else None
+        resultados.append({
+            "caso": nome,
+            "segundos": segundos,
+            "baseline": anterior,
+            "razao": round(razao, 2) if razao else None,
+            "regressao": bool(razao and razao > 1 + args.tolerancia),
+        })
+
+    tabela = pd.DataFrame(resultados)
+    print(tabela.to_string(index=False))
+
+    if tabela["regressao"].any():
+        print(f"\nREGRESSÃO: mais de {args.tolerancia:.0%} acima do baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
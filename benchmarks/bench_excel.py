@@ -0,0 +1,75 @@
+# --------------------------------------------------
+# BENCHMARK DOS ENGINES DO EXCEL (calamine x openpyxl)
+# Planilhas no mesmo formato das exportações reais.
+#
+# Uso:
+#   python benchmarks/bench_excel.py --linhas 5000 50000 --repeticoes 3
+# --------------------------------------------------
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leitura import ENGINES_EXCEL, _engine_disponivel  # noqa: E402
+
+import gerador  # noqa: E402
+
+
+# --------------------------------------------------
+# PLANILHAS
+# --------------------------------------------------
+def diretorio_emails():
+    caminho = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "emails_unidades.xlsx"
+    )
+    with open(caminho, "rb") as f:
+        return f.read(), {"header": 0}
+
+
+# --------------------------------------------------
+# MEDIÇÃO
+# --------------------------------------------------
+def medir(conteudo, kwargs, engine, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        pd.read_excel(io.BytesIO(conteudo), engine=engine, **kwargs)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    engines = [e for e in ENGINES_EXCEL if _engine_disponivel(e)]
+    if len(engines) < len(ENGINES_EXCEL):
+        print("aviso: python-calamine não instalado, medindo só o openpyxl")
+
+    casos = [("emails_unidades.xlsx", *diretorio_emails())]
+    for linhas in args.linhas:
+        casos.append((f"TMS {linhas} linhas", gerador.exportacao_tms(linhas), {"header": 1}))
+        casos.append((f"RE arcos {linhas} linhas", gerador.planilha_arcos(linhas), {}))
+
+    resultados = []
+    for nome, conteudo, kwargs in casos:
+        linha = {"planilha": nome, "tamanho_kb": len(conteudo) // 1024}
+        for engine in engines:
+            linha[engine] = round(medir(conteudo, kwargs, engine, args.repeticoes), 3)
+        if "calamine" in linha:
+            linha["ganho"] = round(linha["openpyxl"] / linha["calamine"], 1)
+        resultados.append(linha)
+
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
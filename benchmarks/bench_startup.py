@@ -0,0 +1,92 @@
+# --------------------------------------------------
+# BENCHMARK DE INICIALIZAÇÃO
+# 1) -X importtime de cada módulo do app (interpretador
+#    novo a cada medição, sem cache de import)
+# 2) tempo até a primeira renderização da página sem
+#    upload (AppTest do Streamlit, também a frio)
+#
+# Uso:
+#   python benchmarks/bench_startup.py --top 10
+# --------------------------------------------------
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = [
+    "envio",
+    "leitura",
+    "diretorios",
+    "memoria",
+    "indice",
+    "coleta",
+    "coletasArcos",
+    "pedidos_txt",
+]
+
+
+def importtime(modulo):
+    # importtime de tudo que o módulo puxa; o streamlit
+    # é importado antes para medir só o custo do app
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import streamlit; import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+
+    linhas = []
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, campos = linha.split(":", 1)
+        proprio, acumulado, nome = [c.strip() for c in campos.split("|")]
+        linhas.append((nome, int(proprio), int(acumulado)))
+
+    # o importtime escreve cada módulo quando ele termina:
+    # o que vem depois da linha do streamlit é custo do app
+    nomes = [n for n, _, _ in linhas]
+    inicio = len(nomes) - nomes[::-1].index("streamlit") if "streamlit" in nomes else 0
+    return linhas[inicio:]
+
+
+def primeira_renderizacao():
+    codigo = (
+        "import time; inicio = time.perf_counter();"
+        "from streamlit.testing.v1 import AppTest;"
+        "AppTest.from_file('app.py', default_timeout=60).run();"
+        "print(time.perf_counter() - inicio)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    print("== import (ms, acumulado, sem o streamlit) ==")
+    for modulo in MODULOS:
+        linhas = importtime(modulo)
+        total = sum(proprio for _, proprio, _ in linhas) / 1000
+        print(f"{modulo:<14} {total:8.1f} ms")
+
+        pesados = sorted(linhas, key=lambda l: l[2], reverse=True)[:args.top]
+        for nome, _, acumulado in pesados:
+            if nome != modulo:
+                print(f"    {nome:<30} {acumulado / 1000:8.1f} ms")
+
+    inicio = time.perf_counter()
+    print("\n== primeira renderização (sem upload) ==")
+    print(f"app.py         {primeira_renderizacao() * 1000:8.1f} ms"
+          f"  (processo completo: {(time.perf_counter() - inicio) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# --------------------------------------------------
+# GERADOR DE ARQUIVOS SINTÉTICOS
+# Mesmos layouts dos arquivos reais, em qualquer tamanho:
+#   tms     exportação do TMS (G = unidade, O = status, S = descrição)
+#   arcos   planilha RE das coletas de Arcos (A1 == "RE")
+#   coleta  planilha de coleta (A2 == "ORDEM")
+#   txt     Central de Pedidos (colunas separadas por 2+ espaços)
+#
+# Uso:
+#   python benchmarks/gerador.py tms --linhas 50000 --formato csv -o tms.csv
+#   python benchmarks/gerador.py txt --linhas 2000 -o pedidos.txt
+# --------------------------------------------------
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+
+STATUS_TMS = ["EM ROTA", "CUSTODIA", "ENTREGUE", "DEVOLVIDO", "AGUARDANDO"]
+DESCRICOES_CUSTODIA = ["AVARIA", "ENDEREÇO NÃO LOCALIZADO", "RECUSA"]
+
+
+def _unidades(qtd):
+    return [f"CO UNIDADE {i:03d}" for i in range(qtd)]
+
+
+def _excel(partes):
+    # partes = [(df, startrow, header)]
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for df, linha, cabecalho in partes:
+            df.to_excel(writer, index=False, header=cabecalho, startrow=linha)
+    return buffer.getvalue()
+
+
+def _com_titulo(df, titulo, formato):
+    if formato == "csv":
+        return (f"{titulo}\n" + df.to_csv(index=False)).encode("utf-8")
+
+    return _excel([
+        (pd.DataFrame([[titulo]]), 0, False),
+        (df, 1, True),
+    ])
+
+
+# --------------------------------------------------
+# TMS
+# --------------------------------------------------
+def exportacao_tms(linhas, formato="xlsx", unidades=300, semente=0):
+    # linha 1 = título, linha 2 = cabeçalho, 19 colunas (A..S)
+    rng = np.random.default_rng(semente)
+
+    df = pd.DataFrame({
+        f"COL_{c}": rng.integers(0, 10**6, linhas).astype(str)
+        for c in "ABCDEFGHIJKLMNOPQRS"
+    })
+    df = df.rename(columns={"COL_A": "CODIGO", "COL_B": "NF"})
+
+    df["COL_G"] = rng.choice(_unidades(unidades), linhas)
+    df["COL_O"] = rng.choice(STATUS_TMS, linhas)
+    df["COL_S"] = np.where(
+        df["COL_O"] == "CUSTODIA",
+        rng.choice(DESCRICOES_CUSTODIA, linhas),
+        ""
+    )
+
+    return _com_titulo(df, "Relatório TMS", formato)
+
+
+# --------------------------------------------------
+# RE ARCOS
+# --------------------------------------------------
+def planilha_arcos(linhas, formato="xlsx", unidades=300, semente=1):
+    rng = np.random.default_rng(semente)
+
+    df = pd.DataFrame({
+        "RE": rng.integers(0, 10**6, linhas),
+        "SIGLA": rng.choice(["AAB", "A40", "23M"], linhas),
+        "TIPO": "COLETA",
+        "CTE": rng.integers(0, 10**6, linhas),
+        "VINCULAR_ACERTO": "",
+        "ORDEM": rng.integers(0, 10**7, linhas),
+        "SITUACAO": "ABERTA",
+        "DT_FINALIZACAO": pd.Timestamp("2024-01-01"),
+        "DIAS_FALTANTES": rng.integers(0, 5, linhas),
+        "SITUACAO_COLETA": "PENDENTE",
+        "UNIDADE": rng.choice(_unidades(unidades), linhas),
+        "EMAIL": "unidade@exemplo.com.br",
+    })
+
+    if formato == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+
+    return _excel([(df, 0, True)])
+
+
+# --------------------------------------------------
+# COLETA (A2 == "ORDEM")
+# --------------------------------------------------
+def planilha_coleta(linhas, formato="xlsx", unidades=300, semente=2):
+    rng = np.random.default_rng(semente)
+
+    df = pd.DataFrame({
+        "ORDEM": rng.choice(10**7, linhas, replace=False),
+        "ORIGEM": rng.choice(_unidades(unidades), linhas),
+        "DESTINO": rng.choice(_unidades(unidades), linhas),
+        "VOLUMES": rng.integers(1, 20, linhas),
+        "PESO": rng.uniform(0.1, 300, linhas).round(2),
+    })
+
+    return _com_titulo(df, "Pré alerta de coleta", formato)
+
+
+# --------------------------------------------------
+# CENTRAL DE PEDIDOS (TXT)
+# --------------------------------------------------
+def txt_pedidos(linhas, restaurantes=80, semente=3):
+    rng = np.random.default_rng(semente)
+
+    cabecalho = (
+        "RESTAURANTE  PEDIDO  DATA  ITEM  QTDE  DESCRICAO  PRECO R$  "
+        "PRECO US$  RESPONSAVEL  OBSERVACAO  OC  CNPJ"
+    )
+    saida = [cabecalho]
+
+    nomes = [f"RESTAURANTE {i:03d}" for i in range(restaurantes)]
+
+    for i in range(linhas):
+        # ~5 itens por pedido
+        pedido = 100000 + i // 5
+        partes = [
+            nomes[pedido % restaurantes],
+            str(pedido),
+            f"{1 + i % 28:02d}/{1 + i % 12:02d}/2024",
+            f"{rng.integers(1000, 9999)}",
+            f"{rng.integers(1, 50)}",
+            f"PRODUTO {rng.integers(1, 500)} CX",
+            f"{rng.uniform(1, 900):.2f}".replace(".", ","),
+        ]
+
+        # preço em dólar e observação só em parte das linhas
+        if i % 3 == 0:
+            partes.append(f"{rng.uniform(1, 200):.2f}".replace(".", ","))
+
+        partes.append(f"COMPRADOR {i % 7}")
+
+        if i % 4 == 0:
+            partes.append("ENTREGAR PELA MANHÃ")
+
+        partes.append(f"OC{rng.integers(10**5, 10**6)}")
+        partes.append(f"{rng.integers(10**13, 10**14)}")
+
+        saida.append("   ".join(partes))
+
+    return "\n".join(saida).encode("latin-1")
+
+
+# --------------------------------------------------
+# ARQUIVO "ENVIADO" (mesma interface do st.file_uploader)
+# --------------------------------------------------
+class Upload(io.BytesIO):
+
+    def __init__(self, conteudo, nome):
+        super().__init__(conteudo)
+        self.name = nome
+        self.size = len(conteudo)
+        self.file_id = nome
+
+
+GERADORES = {
+    "tms": exportacao_tms,
+    "arcos": planilha_arcos,
+    "coleta": planilha_coleta,
+    "txt": txt_pedidos,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tipo", choices=sorted(GERADORES))
+    parser.add_argument("--linhas", type=int, default=5000)
+    parser.add_argument("--formato", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("-o", "--saida", required=True)
+    args = parser.parse_args()
+
+    if args.tipo == "txt":
+        conteudo = txt_pedidos(args.linhas)
+    else:
+        conteudo = GERADORES[args.tipo](args.linhas, args.formato)
+
+    with open(args.saida, "wb") as f:
+        f.write(conteudo)
+
+    print(f"{args.saida}: {len(conteudo) // 1024} KB")
+
+
+if __name__ == "__main__":
+    main()
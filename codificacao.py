@@ -0,0 +1,106 @@
+import re
+from email.charset import BASE64, QP, Charset
+from email.mime.text import MIMEText
+
+# --------------------------------------------------
+# CODIFICAÇÃO COMPACTA DAS MENSAGENS
+# O MIMEText padrão manda os corpos acentuados em
+# base64 (+33%) e o HTML vai com toda a indentação
+# do código. Aqui o HTML é enxugado e a codificação
+# escolhida é a menor que o servidor aceita:
+#   ASCII puro      → 7bit
+#   8BITMIME        → 8bit (UTF-8 cru)
+#   senão           → quoted-printable ou base64,
+#                     o que ficar menor
+# 7bit/8bit não quebram linha: linha acima de 998 bytes
+# (limite do SMTP) sem espaço onde quebrar vai em QP
+# ou base64, que quebram linha.
+# --------------------------------------------------
+LIMITE_LINHA = 998
+
+TAGS_BLOCO = (
+    "html|head|body|div|p|br|ul|ol|li|table|thead|tbody|tr|th|td|h[1-6]"
+)
+
+# espaço em volta de tag de bloco não aparece na tela
+_ESPACO_BLOCO = re.compile(
+    rf"\s*(</?(?:{TAGS_BLOCO})\b[^>]*>)\s*",
+    re.IGNORECASE
+)
+_ESPACOS = re.compile(r"\s+")
+_FIM_BLOCO = re.compile(
+    r"(</(?:div|p|ul|ol|li|table|thead|tbody|tr|h[1-6])>|<br\s*/?>)",
+    re.IGNORECASE
+)
+
+
+def _quebrar_linha(linha):
+    # no HTML quebra de linha e espaço dão no mesmo: parágrafo
+    # longo é quebrado no último espaço antes do limite
+    # (o byte do espaço nunca aparece dentro de um caractere UTF-8)
+    dados = linha.encode("utf-8")
+    partes = []
+
+    while len(dados) > LIMITE_LINHA:
+        corte = dados.rfind(b" ", 0, LIMITE_LINHA + 1)
+        if corte <= 0:
+            break
+        partes.append(dados[:corte])
+        dados = dados[corte + 1:]
+
+    partes.append(dados)
+    return b"\n".join(partes).decode("utf-8")
+
+
+def minificar_html(html):
+    html = _ESPACOS.sub(" ", html)
+    html = _ESPACO_BLOCO.sub(r"\1", html)
+
+    # quebra de linha depois de cada bloco e, dentro de um
+    # bloco longo, nos espaços: linhas até 998 bytes
+    html = _FIM_BLOCO.sub("\\1\n", html)
+
+    return "\n".join(_quebrar_linha(linha) for linha in html.strip().split("\n"))
+
+
+def _linha_longa(dados):
+    return any(len(linha) > LIMITE_LINHA for linha in dados.split(b"\n"))
+
+
+def _tamanho_qp(dados):
+    escapados = sum(1 for b in dados if b > 126 or b == 61)
+    bruto = len(dados) + 2 * escapados
+    # quebras "=\r\n" a cada 76 caracteres
+    return bruto + 3 * (bruto // 75)
+
+
+def _tamanho_base64(dados):
+    bruto = 4 * ((len(dados) + 2) // 3)
+    return bruto + 2 * (bruto // 76)
+
+
+def corpo_html(html, oito_bits=False):
+    html = minificar_html(html)
+    dados = html.encode("utf-8")
+    longa = _linha_longa(dados)
+
+    if dados.isascii() and not longa:
+        return MIMEText(html, "html", "us-ascii")
+
+    charset = Charset("utf-8")
+
+    if oito_bits and not longa:
+        charset.body_encoding = None  # 8bit
+    elif _tamanho_qp(dados) <= _tamanho_base64(dados):
+        charset.body_encoding = QP
+    else:
+        charset.body_encoding = BASE64
+
+    return MIMEText(html, "html", charset)
+
+
+def usa_oito_bits(msg):
+    return any(
+        parte.get("Content-Transfer-Encoding") == "8bit"
+        for parte in msg.walk()
+    )
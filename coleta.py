@@ -1,22 +1,35 @@
-import streamlit as st
 import pandas as pd
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from email.mime.text import MIMEText
+import streamlit as st
 
-# --------------------------------------------------
-# BASE DE E-MAILS DAS UNIDADES
-# --------------------------------------------------
-@st.cache_data
-def carregar_emails_unidades():
-    df = pd.read_excel("emails_unidades.xlsx", header=0)
-    df.columns = ["UNIDADE", "EMAILS"]
+from destinatarios import mostrar_problemas_diretorio
+from diretorios import (
+    ARQUIVO_UNIDADES,
+    carregar_emails_unidades,
+    problemas_diretorio,
+)
+from leitura import normalizar_categorias
+import agenda
+import anexos
+import envio
+import previa
+import remetentes
 
-    df["UNIDADE"] = df["UNIDADE"].astype(str).str.strip().str.upper()
-    df["EMAILS"] = df["EMAILS"].astype(str).str.strip()
 
-    return dict(zip(df["UNIDADE"], df["EMAILS"]))
+def corpo_coleta(texto_base, pedidos_unidade):
+    texto_html = texto_base.replace("\n", "<br>")
+
+    tabela_email = pedidos_unidade.drop(columns=["TEM_PDF"], errors="ignore")
+
+    tabela_html = tabela_email.to_html(
+        index=False,
+        border=1
+    )
+
+    return f"""
+    <p>{texto_html}</p>
+    {tabela_html}
+    <p><i>Mensagem automática.</i></p>
+    """
 
 
 def run(df):
@@ -27,24 +40,15 @@ def run(df):
     )
 
     # --------------------------------------------------
-    # NORMALIZA COLUNAS
+    # COLUNAS
+    # nomes já normalizados e ORDEM / ORIGEM validadas na
+    # leitura (esquemas.COLETA)
     # --------------------------------------------------
-    df.columns = (
-        df.columns
-        .astype(str)
-        .str.strip()
-        .str.upper()
-    )
-
     COL_ORDEM = "ORDEM"
     COL_ORIGEM = "ORIGEM"
 
-    if COL_ORDEM not in df.columns or COL_ORIGEM not in df.columns:
-        st.error("A planilha não contém as colunas obrigatórias (ORDEM, ORIGEM).")
-        st.stop()
-
     df[COL_ORDEM] = df[COL_ORDEM].astype(str).str.strip()
-    df[COL_ORIGEM] = df[COL_ORIGEM].astype(str).str.strip().str.upper()
+    normalizar_categorias(df, [COL_ORIGEM])
 
     # --------------------------------------------------
     # UPLOAD DOS PDFs
@@ -57,18 +61,59 @@ def run(df):
     with col_pdfs:
         pdfs = st.file_uploader(
             "Importar PDFs",
-            type=["pdf"],
-            accept_multiple_files=True
+            type=["pdf", "zip"],
+            accept_multiple_files=True,
+            help="PDFs soltos ou um .zip com os PDFs (nome do arquivo = ORDEM)"
         )
 
         if not pdfs:
             st.info("Aguardando upload dos PDFs.")
             st.stop()
 
-    pdf_map = {
-        pdf.name.replace(".pdf", "").strip(): pdf
-        for pdf in pdfs
-    }
+    # ORDEM → PDFs (o .zip é lido sob demanda, sem extrair)
+    lista_anexos, ignorados = anexos.indexar(pdfs)
+    pdf_map, pdfs_sem_ordem, ordens_sem_pdf, pdfs_por_sufixo = anexos.casar(
+        df[COL_ORDEM], lista_anexos
+    )
+
+    st.caption(
+        f"📎 {len(lista_anexos)} PDFs · {len(pdf_map)} ordens com PDF"
+        f" · {len(ordens_sem_pdf)} ordens sem PDF"
+        f" · {len(pdfs_sem_ordem)} PDFs sem ordem"
+    )
+
+    if pdfs_sem_ordem or ordens_sem_pdf or ignorados or pdfs_por_sufixo:
+        with st.expander("🔎 Conferência dos PDFs", expanded=bool(pdfs_por_sufixo)):
+            if pdfs_por_sufixo:
+                st.warning(
+                    "PDFs casados pelo número da ORDEM com sufixo no nome "
+                    "(_assinado, (1), -2). Confira antes de enviar:"
+                )
+                st.dataframe(
+                    pd.DataFrame(pdfs_por_sufixo, columns=["Arquivo", "ORDEM"]),
+                    hide_index=True
+                )
+
+            if pdfs_sem_ordem:
+                st.warning("PDFs sem ORDEM correspondente na planilha:")
+                st.write(pdfs_sem_ordem)
+
+            if ordens_sem_pdf:
+                st.warning("ORDENs da planilha sem PDF:")
+                st.write(ordens_sem_pdf)
+
+            if ignorados:
+                st.warning("Arquivos ignorados:")
+                st.dataframe(
+                    pd.DataFrame(ignorados, columns=["Arquivo", "Motivo"]),
+                    hide_index=True
+                )
+
+    # PDF casado pelo sufixo só sai com o de acordo do operador
+    sufixos_conferidos = not pdfs_por_sufixo or st.checkbox(
+        f"Conferi os {len(pdfs_por_sufixo)} PDF(s) casados pelo sufixo do nome",
+        key="coleta_sufixos_ok"
+    )
 
     df["TEM_PDF"] = df[COL_ORDEM].isin(pdf_map.keys())
 
@@ -84,7 +129,7 @@ def run(df):
     # --------------------------------------------------
     # AGRUPAMENTO POR UNIDADE (ORIGEM)
     # --------------------------------------------------
-    grupos = df_envio.groupby(COL_ORIGEM)
+    grupos = df_envio.groupby(COL_ORIGEM, observed=True)
 
     st.markdown("---")
     st.subheader("📊 Resumo por unidade")
@@ -98,12 +143,19 @@ def run(df):
     st.markdown("---")
     st.subheader("✉️ Configuração do e-mail")
 
+    mostrar_problemas_diretorio(
+        problemas_diretorio(ARQUIVO_UNIDADES), ARQUIVO_UNIDADES
+    )
+
     cc_input = st.text_input(
         "CC (separados por vírgula)",
         placeholder="atendimento1@evelog.com.br, atendimento2@evelog.com.br",
         key="coleta_cc"
     )
 
+    cc_resumo, anexar_eml = envio.opcoes_copia("coleta")
+    inicio, espalhar_min = agenda.opcoes_agendamento("coleta")
+
     texto_base = st.text_area(
         "Corpo do e-mail",
         placeholder="Digite a mensagem",
@@ -111,6 +163,22 @@ def run(df):
         key="coleta_texto"
     )
 
+    # --------------------------------------------------
+    # PRÉVIA
+    # --------------------------------------------------
+    htmls = previa.cache_renders(
+        "coleta",
+        (int(pd.util.hash_pandas_object(df_envio, index=False).sum()), texto_base)
+    )
+
+    previa.mostrar_previa(
+        "coleta",
+        list(grupos.groups),
+        lambda unidade: corpo_coleta(texto_base, grupos.get_group(unidade)),
+        htmls,
+        carregar_emails_unidades()
+    )
+
     # --------------------------------------------------
     # ENVIO
     # --------------------------------------------------
@@ -127,6 +195,10 @@ def run(df):
             st.error("Preencha o corpo do e-mail.")
             st.stop()
 
+        if not sufixos_conferidos:
+            st.error("Confira os PDFs casados pelo sufixo do nome (Conferência dos PDFs).")
+            st.stop()
+
         # CCs
         cc_list = []
         if cc_input:
@@ -138,117 +210,62 @@ def run(df):
 
         emails_unidades = carregar_emails_unidades()
 
-        enviados = 0
+        mensagens = []
         sem_email = []
 
-        progress = st.progress(0)
-        total = len(grupos)
-
-        log_envio = []
-        sem_email = []
-
-        emails_enviados = 0
-        total_unidades = len(grupos)
-
-        progress_bar = st.progress(0)
-        contador_placeholder = st.empty()
-
-        with st.spinner("📨 Enviando e-mails de coleta..."):
-            try:
-                with smtplib.SMTP_SSL("email-ssl.com.br", 465) as smtp:
-                    smtp.login(email_user, senha)
-
-                    for i, (unidade, pedidos_unidade) in enumerate(grupos, start=1):
-
-                        emails_raw = emails_unidades.get(unidade)
-
-                        if not emails_raw:
-                            sem_email.append(unidade)
-                            continue
-
-                        emails_to = [
-                            e.strip() for e in emails_raw.split(",") if e.strip()
-                        ]
-
-                        ordens = pedidos_unidade["ORDEM"].tolist()
-                        ordens_txt = ", ".join(ordens)
-
-                        assunto = (
-                            "PRÉ ALERTA DE COLETA TRAMONTINA - "
-                            f"{ordens_txt}"
-                        )
-
-                        texto_html = texto_base.replace("\n", "<br>")
-
-                        tabela_email = pedidos_unidade.drop(columns=["TEM_PDF"], errors="ignore")
-
-                        tabela_html = tabela_email.to_html(
-                            index=False,
-                            border=1
-                        )
-
-                        corpo_html = f"""
-                        <p>{texto_html}</p>
-                        {tabela_html}
-                        <p><i>Mensagem automática.</i></p>
-                        """
-
-                        msg = MIMEMultipart()
-                        msg["From"] = email_user
-                        msg["To"] = ", ".join(emails_to)
-                        msg["Subject"] = assunto
-                        msg["Cc"] = ", ".join(cc_list)
-
-                        msg.attach(MIMEText(corpo_html, "html"))
-
-                        # ANEXA PDFs DA UNIDADE
-                        for ordem in ordens:
-                            pdf = pdf_map.get(ordem)
-                            if pdf:
-                                anexo = MIMEApplication(pdf.read(), _subtype="pdf")
-                                anexo.add_header(
-                                    "Content-Disposition",
-                                    "attachment",
-                                    filename=pdf.name
-                                )
-                                msg.attach(anexo)
-
-                        smtp.send_message(
-                            msg,
-                            to_addrs=emails_to + cc_list
-                        )
-
-                        log_envio.append({
-                            "Unidade": unidade,
-                            "Qtd registros": len(pedidos_unidade),
-                            "Para": ", ".join(emails_to),
-                            "CC": ", ".join(cc_list)
-                        })
-
-                        emails_enviados += 1
-
-                        percentual = int((emails_enviados / total_unidades) * 100)
-                        progress_bar.progress(percentual)
-
-                        contador_placeholder.markdown(
-                            f"""
-                            **📧 E-mails enviados:** {emails_enviados}  
-                            **🏢 Unidades acionadas:** {emails_enviados} / {total_unidades}
-                            """
-                        )
-
-                        enviados += 1
-                        progress.progress(int((i / total) * 100))
-
-                st.success(f"✅ {enviados} e-mails enviados com sucesso!")
-
-                if log_envio:
-                    st.subheader("📄 Log de envio")
-                    st.dataframe(pd.DataFrame(log_envio))
-
-                if sem_email:
-                    st.warning("⚠️ Unidades sem e-mail cadastrado:")
-                    st.write(sem_email)
-
-            except Exception as e:
-                st.error(f"Erro no envio: {e}")
+        for unidade, pedidos_unidade in grupos:
+
+            emails_to = list(emails_unidades.get(unidade, ()))
+
+            if not emails_to:
+                sem_email.append(unidade)
+                continue
+
+            ordens = pedidos_unidade["ORDEM"].tolist()
+            ordens_txt = ", ".join(ordens)
+
+            assunto = (
+                "PRÉ ALERTA DE COLETA TRAMONTINA - "
+                f"{ordens_txt}"
+            )
+
+            # corpo já renderizado na prévia é reaproveitado
+            corpo_html = htmls.get(unidade)
+            if corpo_html is None:
+                corpo_html = corpo_coleta(texto_base, pedidos_unidade)
+
+            # PDFs DA UNIDADE: (nome, ler), lidos só no envio
+            anexos_unidade = [
+                anexo
+                for ordem in dict.fromkeys(ordens)
+                for anexo in pdf_map.get(ordem, ())
+            ]
+
+            mensagens.append({
+                "para": emails_to,
+                "cc": cc_list,
+                "assunto": assunto,
+                "html": corpo_html,
+                "anexos": anexos_unidade,
+                "log": {
+                    "Unidade": unidade,
+                    "Qtd registros": len(pedidos_unidade),
+                    "Para": ", ".join(emails_to),
+                    "CC": ", ".join(cc_list)
+                }
+            })
+
+        job_id = envio.enfileirar(
+            descricao="Pré alerta de coleta",
+            email_user=email_user,
+            senha=senha,
+            mensagens=mensagens,
+            sem_email=sem_email,
+            contas_extras=remetentes.contas_extras_da_sessao(),
+            cc_resumo=cc_resumo,
+            anexar_eml=anexar_eml,
+            prioridade=agenda.NORMAL,
+            inicio=inicio,
+            espalhar_min=espalhar_min
+        )
+        envio.registrar_job_na_sessao(job_id)
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------
+# MODO DELTA (SÓ O QUE MUDOU DESDE O ÚLTIMO ENVIO)
+# A cada envio guardamos, por status, uma foto das
+# linhas entregues (chave Codigo|Nota Fiscal + hash da linha).
+# No upload seguinte cada linha sai como "novo",
+# "alterado" ou "" e as linhas que sumiram como
+# removidas; unidade sem nada disso não precisa
+# receber o e-mail de novo.
+#
+# Fotos em JSON (nunca pickle): a pasta é compartilhada
+# com os workers da fila e ler um pickle de lá executaria
+# o que alguém tivesse gravado nela.
+#
+# AUTOMAILER_SNAPSHOTS  pasta das fotos (padrão .snapshots)
+# --------------------------------------------------
+PASTA_SNAPSHOTS = os.environ.get("AUTOMAILER_SNAPSHOTS", ".snapshots")
+
+# fotos pendentes de jobs que nunca terminaram
+# (servidor reiniciado no meio) são apagadas depois disso
+VALIDADE_PENDENTE_S = 7 * 24 * 3600
+
+# colunas do frame reduzido (esquemas.TMS)
+POS_CODIGO = 0
+POS_NOTA_FISCAL = 1
+
+
+def _arquivo(status):
+    nome = hashlib.sha1(str(status).encode()).hexdigest()[:16]
+    return os.path.join(PASTA_SNAPSHOTS, f"{nome}.json")
+
+
+def _chaves(linhas):
+    chave = (
+        linhas.iloc[:, POS_CODIGO].astype(str).str.strip()
+        + "|"
+        + linhas.iloc[:, POS_NOTA_FISCAL].astype(str).str.strip()
+    )
+
+    # mesma chave repetida na exportação: numera as ocorrências
+    ocorrencia = chave.groupby(chave).cumcount().astype(str)
+
+    return (chave + "#" + ocorrencia).values
+
+
+def _hashes(linhas):
+    return pd.util.hash_pandas_object(
+        linhas.astype(str), index=False
+    ).values
+
+
+def foto(linhas, col_unidade):
+    return pd.DataFrame({
+        "chave": _chaves(linhas),
+        "unidade": linhas[col_unidade].astype(str).values,
+        "hash": _hashes(linhas),
+    })
+
+
+def _foto_json(atual):
+    # hash vai como int do Python: uint64 exato no JSON
+    return {
+        "chave": atual["chave"].tolist(),
+        "unidade": atual["unidade"].tolist(),
+        "hash": atual["hash"].tolist(),
+    }
+
+
+def _foto_de_json(dados):
+    return pd.DataFrame({
+        "chave": pd.Series(dados["chave"], dtype=object),
+        "unidade": pd.Series(dados["unidade"], dtype=object),
+        "hash": np.array(dados["hash"], dtype=np.uint64),
+    })
+
+
+def _ler_json(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_json(caminho, dados):
+    # arquivo temporário + replace: app e workers nunca
+    # leem uma foto pela metade
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f)
+
+    os.replace(temporario, caminho)
+
+
+def carregar_snapshot(status):
+    caminho = _arquivo(status)
+
+    if not os.path.exists(caminho):
+        return None
+
+    return _foto_de_json(_ler_json(caminho))
+
+
+def _salvar_snapshot(status, atual):
+    _gravar_json(_arquivo(status), _foto_json(atual))
+
+
+# --------------------------------------------------
+# FOTO SÓ DO QUE FOI ENTREGUE
+# No envio, a foto das linhas do filtro fica pendente com
+# o id do job; quando o job termina, só as unidades que
+# estão no log de enviados entram na foto do status. Sem
+# e-mail, falha ou job que não saiu: a unidade continua
+# com a foto anterior e volta no próximo delta.
+# Com a fila compartilhada, AUTOMAILER_SNAPSHOTS precisa
+# ser a mesma pasta para o app e os workers.
+# --------------------------------------------------
+def _arquivo_pendente(job_id):
+    return os.path.join(PASTA_SNAPSHOTS, "pendentes", f"{job_id}.json")
+
+
+def _limpar_pendentes():
+    pasta = os.path.dirname(_arquivo_pendente(""))
+    limite = time.time() - VALIDADE_PENDENTE_S
+
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+def registrar_pendente(job_id, linhas_por_status, col_unidade):
+    # linhas_por_status = {status: linhas do filtro (mesmas do delta)}
+    caminho = _arquivo_pendente(job_id)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    _limpar_pendentes()
+
+    _gravar_json(caminho, {
+        str(status): _foto_json(foto(linhas, col_unidade))
+        for status, linhas in linhas_por_status.items()
+    })
+
+
+def confirmar_entrega(job):
+    # chamado no fim do job (envio.py / worker.py)
+    caminho = _arquivo_pendente(job["id"])
+
+    if not os.path.exists(caminho):
+        return
+
+    entregues = {
+        str(linha["Unidade"]) for linha in job["log"] if "Unidade" in linha
+    }
+
+    for status, dados in _ler_json(caminho).items():
+        atual = _foto_de_json(dados)
+        atual = atual[atual["unidade"].isin(entregues)]
+        anterior = carregar_snapshot(status)
+
+        if anterior is not None:
+            atual = pd.concat(
+                [anterior[~anterior["unidade"].isin(entregues)], atual],
+                ignore_index=True
+            )
+
+        _salvar_snapshot(status, atual)
+
+    os.remove(caminho)
+
+
+# --------------------------------------------------
+# DELTA
+# linhas = linhas do status (e descrições escolhidas) no upload atual
+# → (situação por linha, unidades com linhas removidas)
+# --------------------------------------------------
+def calcular_delta(status, linhas, col_unidade):
+    atual = foto(linhas, col_unidade)
+    anterior = carregar_snapshot(status)
+
+    if anterior is None:
+        situacao = np.full(len(linhas), "novo", dtype=object)
+        return pd.Series(situacao, index=linhas.index), set()
+
+    hash_anterior = atual["chave"].map(
+        dict(zip(anterior["chave"], anterior["hash"]))
+    )
+
+    situacao = np.where(
+        hash_anterior.isna(),
+        "novo",
+        np.where(hash_anterior.values != atual["hash"].values, "alterado", "")
+    )
+
+    removidas = anterior.loc[
+        ~anterior["chave"].isin(atual["chave"]), "unidade"
+    ]
+
+    return pd.Series(situacao, index=linhas.index), set(removidas)
+
+
+def resumo(situacao, removidas):
+    return {
+        "novos": int((situacao == "novo").sum()),
+        "alterados": int((situacao == "alterado").sum()),
+        "unidades com removidos": len(removidas),
+    }
+
+
+def unidades_alteradas(status, linhas, col_unidade):
+    # → (unidades com linhas novas / alteradas / removidas, resumo)
+    situacao, removidas = calcular_delta(status, linhas, col_unidade)
+
+    alteradas = removidas | set(
+        linhas.loc[situacao != "", col_unidade].astype(str)
+    )
+
+    return alteradas, resumo(situacao, removidas)
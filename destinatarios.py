@@ -0,0 +1,132 @@
+import pandas as pd
+import streamlit as st
+
+# --------------------------------------------------
+# VALIDAÇÃO DE DESTINATÁRIOS (PRÉ-ENVIO)
+# Sintaxe e duplicados resolvidos uma vez, antes de
+# abrir qualquer conexão SMTP: endereço inválido,
+# "nan" vindo do astype(str) e e-mail repetido entre
+# Para e CC não viram tentativa / rejeição no envio.
+# --------------------------------------------------
+REGEX_EMAIL = (
+    r"[A-Za-z0-9._%+'-]+"
+    r"@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"
+)
+
+SEPARADORES = r"[,;]"
+
+
+def _explodir(valores):
+    # células "a@x, b@y" -> uma linha por endereço
+    return (
+        valores
+        .astype(str)
+        .str.split(SEPARADORES, regex=True)
+        .explode()
+        .str.strip()
+    )
+
+
+def _problema(enderecos):
+    enderecos = enderecos.reset_index(drop=True)
+
+    valido = enderecos.str.fullmatch(REGEX_EMAIL).fillna(False).astype(bool)
+
+    problema = pd.Series(None, index=enderecos.index, dtype=object)
+    problema[~valido] = "sintaxe inválida"
+    problema[enderecos == ""] = "vazio"
+    problema[
+        enderecos.isna() | enderecos.str.upper().isin(["NAN", "NONE"])
+    ] = "sem e-mail (nan)"
+
+    return problema.values
+
+
+def enderecos_unicos(enderecos):
+    vistos = set()
+    unicos = []
+    for e in enderecos:
+        chave = e.lower()
+        if chave not in vistos:
+            vistos.add(chave)
+            unicos.append(e)
+    return unicos
+
+
+# --------------------------------------------------
+# DIRETÓRIOS (emails_unidades / emails_restaurantes)
+# --------------------------------------------------
+def validar_diretorio(chaves, emails):
+    chaves = list(chaves)
+
+    enderecos = _explodir(pd.Series(list(emails), index=chaves))
+
+    df = pd.DataFrame({
+        "Chave": enderecos.index,
+        "Endereço": enderecos.values,
+        "Problema": _problema(enderecos),
+    })
+
+    limpo = {chave: () for chave in chaves}
+    validos = df[df["Problema"].isna()]
+    for chave, grupo in validos.groupby("Chave", sort=False):
+        limpo[chave] = tuple(enderecos_unicos(grupo["Endereço"]))
+
+    # "vazio" = sobra de vírgula no fim da célula, não é erro
+    relatorio = df[
+        df["Problema"].notna() & (df["Problema"] != "vazio")
+    ].reset_index(drop=True)
+
+    return limpo, relatorio
+
+
+def mostrar_problemas_diretorio(relatorio, nome):
+    if relatorio.empty:
+        return
+
+    with st.expander(f"⚠️ {nome}: {len(relatorio)} endereço(s) com problema"):
+        st.dataframe(relatorio, hide_index=True)
+
+
+# --------------------------------------------------
+# MENSAGENS (Para + CC de cada grupo)
+# --------------------------------------------------
+def preflight(mensagens):
+    if not mensagens:
+        return [], []
+
+    # todos os endereços de todas as mensagens validados
+    # de uma vez só
+    linhas = pd.Series(
+        [m["para"] for m in mensagens] + [m["cc"] for m in mensagens]
+    ).explode().dropna().astype(str).str.strip()
+
+    invalidos = set(linhas[pd.notna(_problema(linhas))].str.lower())
+
+    aprovadas = []
+    rejeitadas = []
+
+    for m in mensagens:
+        para = enderecos_unicos(e.strip() for e in m["para"] if e.strip().lower() not in invalidos)
+        vistos = {e.lower() for e in para}
+        cc = [
+            e for e in enderecos_unicos(e.strip() for e in m["cc"])
+            if e.lower() not in invalidos and e.lower() not in vistos
+        ]
+
+        descartados = [
+            e for e in list(m["para"]) + list(m["cc"])
+            if e.strip().lower() in invalidos
+        ]
+
+        if not para:
+            rejeitadas.append({
+                **m["log"],
+                "Erro": "nenhum destinatário válido"
+                + (f" ({', '.join(descartados)})" if descartados else "")
+            })
+            continue
+
+        aprovadas.append({**m, "para": para, "cc": cc})
+
+    return aprovadas, rejeitadas
@@ -0,0 +1,47 @@
+import os
+from types import MappingProxyType
+
+import streamlit as st
+
+from destinatarios import validar_diretorio
+from leitura import ler_excel
+
+# --------------------------------------------------
+# DIRETÓRIOS DE E-MAIL (UNIDADES / RESTAURANTES)
+# A = Unidade | B = Emails
+# Carregados uma vez por processo e compartilhados,
+# somente leitura, entre todas as sessões. Editar a
+# planilha (mtime) invalida o cache.
+# --------------------------------------------------
+ARQUIVO_UNIDADES = "emails_unidades.xlsx"
+ARQUIVO_RESTAURANTES = "emails_restaurantes.xlsx"
+
+
+@st.cache_resource(show_spinner=False)
+def _carregar_diretorio(caminho, modificado_em):
+    df = ler_excel(caminho, header=0)
+    df.columns = ["CHAVE", "EMAILS"]
+
+    df["CHAVE"] = df["CHAVE"].astype(str).str.strip().str.upper()
+
+    # endereços já separados, validados e sem duplicados:
+    # CHAVE -> tupla de e-mails (vazia = sem e-mail)
+    limpo, relatorio = validar_diretorio(df["CHAVE"], df["EMAILS"])
+
+    return MappingProxyType(limpo), relatorio
+
+
+def carregar_diretorio(caminho):
+    return _carregar_diretorio(caminho, os.path.getmtime(caminho))[0]
+
+
+def problemas_diretorio(caminho):
+    return _carregar_diretorio(caminho, os.path.getmtime(caminho))[1]
+
+
+def carregar_emails_unidades():
+    return carregar_diretorio(ARQUIVO_UNIDADES)
+
+
+def carregar_emails_restaurantes():
+    return carregar_diretorio(ARQUIVO_RESTAURANTES)
@@ -0,0 +1,749 @@
+import hashlib
+import hmac
+import mimetypes
+import os
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+
+import streamlit as st
+
+from codificacao import corpo_html, usa_oito_bits
+import agenda
+import fila
+import perfil
+import relays
+import remetentes
+import resumo_envio
+
+# --------------------------------------------------
+# ENVIO EM SEGUNDO PLANO
+# Os fluxos só montam as mensagens e entregam um job
+# para o worker. O worker é uma thread única do processo
+# do Streamlit: continua enviando mesmo se a aba fechar
+# e intercala os jobs por prioridade (ver agenda.py). Com contas
+# adicionais, as mensagens são distribuídas entre elas
+# (ver remetentes.py). Com AUTOMAILER_FILA o job vai para
+# a fila compartilhada e quem envia são os processos do
+# worker.py (ver fila.py).
+#
+# Mensagem = dict com:
+#   para, cc     listas de e-mails
+#   assunto      texto
+#   html         corpo do e-mail
+#   anexos       [(nome, bytes ou ler)] (opcional); ler() devolve
+#                os bytes e só é chamado quando a mensagem sai
+#   log          dict que vai para o log de envio
+# --------------------------------------------------
+# servidores SMTP e disjuntor: ver relays.py
+TENTATIVAS = 3
+RECONECTAR_A_CADA = 20
+OCIOSA_S = 60
+MAX_ESPERA_SERVIDOR_S = 1800
+
+# painel: só os jobs mais recentes, e atualização
+# automática só enquanto algum deles está andando
+MAX_JOBS_PAINEL = 10
+STATUS_ATIVOS = (
+    "na fila", "agendado", "enviando", "aguardando servidor", "finalizando"
+)
+
+# chave do HMAC das credenciais: o hash que vai para o
+# arquivo da fila só é conferido (ou atacado) por quem tem
+# a chave. Com AUTOMAILER_FILA, AUTOMAILER_SEGREDO precisa
+# ser o mesmo no app, no vigia.py e nos workers; sem a
+# fila o hash não sai do processo e a chave é aleatória.
+SEGREDO = os.environ.get("AUTOMAILER_SEGREDO", "")
+_CHAVE_HMAC = SEGREDO.encode() or secrets.token_bytes(32)
+
+_jobs = {}
+_execucoes = {}
+_perfis = {}
+_lock = threading.Lock()
+_worker = None
+
+
+# --------------------------------------------------
+# MONTAGEM DA MENSAGEM
+# --------------------------------------------------
+def montar_mensagem(item, remetente, oito_bits=False):
+    corpo = corpo_html(item["html"], oito_bits)
+
+    if item.get("anexos"):
+        msg = MIMEMultipart()
+        msg.attach(corpo)
+
+        for nome, conteudo in item["anexos"]:
+            if callable(conteudo):
+                conteudo = conteudo()
+
+            tipo = mimetypes.guess_type(nome)[0] or "application/octet-stream"
+            anexo = MIMEApplication(conteudo, _subtype=tipo.split("/")[1])
+            anexo.add_header(
+                "Content-Disposition",
+                "attachment",
+                filename=nome
+            )
+            msg.attach(anexo)
+    else:
+        msg = corpo
+
+    msg["From"] = remetente
+    msg["To"] = ", ".join(item["para"])
+    msg["Subject"] = item["assunto"]
+    if item["cc"]:
+        msg["Cc"] = ", ".join(item["cc"])
+
+    return msg
+
+
+# --------------------------------------------------
+# JOBS
+# --------------------------------------------------
+def enfileirar(descricao, email_user, senha, mensagens, sem_email=(), pausa=0,
+               contas_extras=(), cc_resumo=False, anexar_eml=False,
+               prioridade=agenda.NORMAL, inicio=None, espalhar_min=0,
+               antes_de_enviar=None):
+    from destinatarios import enderecos_unicos, preflight
+
+    # sintaxe e duplicados resolvidos antes de qualquer conexão
+    mensagens, rejeitadas = preflight(mensagens)
+
+    # CC em modo resumo: ninguém é copiado nas mensagens;
+    # os CCs recebem um único resumo no fim do job
+    copias = []
+    if cc_resumo:
+        copias = enderecos_unicos(e for m in mensagens for e in m["cc"])
+        mensagens = [
+            {
+                **m,
+                "cc": [],
+                "log": {**m["log"], "CC": "(resumo)"} if "CC" in m["log"] else m["log"],
+            }
+            for m in mensagens
+        ]
+
+    job = {
+        "id": uuid.uuid4().hex[:8],
+        "descricao": descricao,
+        "usuario": email_user,
+        "senha": senha,
+        "credencial": hash_credencial(email_user, senha),
+        # conta principal + contas adicionais do pool
+        "contas": [(email_user, senha)] + [
+            (u, p) for u, p in contas_extras if u != email_user
+        ],
+        "mensagens": list(mensagens),
+        "cc_resumo": copias,
+        "anexar_eml": bool(copias) and anexar_eml,
+        "pausa": pausa,
+        "prioridade": prioridade,
+        "inicio": inicio,
+        # intervalo entre mensagens: pausa mínima ou o
+        # espalhamento do job pela janela pedida
+        "intervalo": max(pausa, espalhar_min * 60 / max(len(mensagens) - 1, 1)),
+        # perfil ligado na sessão → o envio também é perfilado
+        "perfil": perfil.ativo(),
+        "status": "na fila",
+        "criado_em": datetime.now(),
+        "total": len(mensagens),
+        "enviados": 0,
+        "bytes": 0,
+        "por_conta": {},
+        "avisos": [],
+        "log": [],
+        "falhas": [],
+        "rejeitadas": rejeitadas,
+        "sem_email": list(sem_email),
+        "erro": None,
+        # resumo para o CC: None (sem resumo / ainda não
+        # tentado), "enviado" ou "não enviado: <erro>"
+        "resumo": None,
+        "aguardando_desde": None,
+        "terminado_em": None,
+    }
+
+    # chamado com o id do job antes de qualquer mensagem sair
+    # (ex.: foto pendente do delta, confirmada no _finalizar)
+    if antes_de_enviar is not None:
+        antes_de_enviar(job["id"])
+
+    if fila.ativa():
+        if not SEGREDO:
+            raise RuntimeError(
+                "Defina AUTOMAILER_SEGREDO (o mesmo dos workers) para usar a fila."
+            )
+
+        job["inicio"] = agenda.dentro_da_janela(prioridade, inicio or time.time())
+        if job["inicio"] > time.time() + 1:
+            job["status"] = "agendado"
+
+        # senhas ficam fora do arquivo compartilhado: o worker
+        # confere o hash com a senha da configuração dele
+        fila.publicar({
+            **job,
+            "contas": [(u, hash_credencial(u, p)) for u, p in job["contas"]],
+        })
+        return job["id"]
+
+    with _lock:
+        _podar_jobs()
+        _jobs[job["id"]] = job
+
+    _garantir_worker()
+    pronto_em = agenda.agendar(job["id"], prioridade, inicio)
+
+    if pronto_em > time.time() + 1:
+        job["status"] = "agendado"
+        job["inicio"] = pronto_em
+
+    return job["id"]
+
+
+def _podar_jobs():
+    # mesmo prazo dos jobs terminados na fila compartilhada
+    limite = time.time() - fila.GUARDAR_JOBS_S
+
+    for job_id in [
+        job["id"] for job in _jobs.values()
+        if job["terminado_em"] is not None and job["terminado_em"] < limite
+    ]:
+        del _jobs[job_id]
+
+
+def obter_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def hash_credencial(email_user, senha):
+    return hmac.new(
+        _CHAVE_HMAC, f"{email_user}\0{senha}".encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def jobs_do_usuario(email_user, senha, ids=()):
+    # jobs desta sessão + jobs do mesmo remetente (mesmas
+    # credenciais) abertos em outra aba que já foi fechada
+    credencial = hash_credencial(email_user, senha) if email_user and senha else None
+
+    if fila.ativa():
+        return fila.jobs(ids, credencial, MAX_JOBS_PAINEL)
+
+    with _lock:
+        jobs = [
+            job for job in _jobs.values()
+            if job["id"] in ids or job["credencial"] == credencial
+        ]
+
+    jobs.sort(key=lambda j: j["criado_em"], reverse=True)
+    return jobs[:MAX_JOBS_PAINEL]
+
+
+# --------------------------------------------------
+# WORKER
+# --------------------------------------------------
+def _conectar(usuario, senha):
+    # primário / secundário conforme a saúde de cada um
+    return relays.conectar(usuario, senha)
+
+
+def _fechar(smtp):
+    try:
+        smtp.quit()
+    except Exception:
+        pass
+
+
+def _conectar_contas(job):
+    # conta que não autentica fica fora do job;
+    # sem nenhuma conta válida o job falha logo
+    conexoes = {}
+    contas = []
+    erros = []
+
+    for usuario, senha in job["contas"]:
+        try:
+            smtp = _conectar(usuario, senha)
+        except relays.RelayIndisponivel:
+            # servidor fora do ar não é problema da conta
+            for conexao in conexoes.values():
+                _fechar(conexao["smtp"])
+            raise
+        except Exception as e:
+            erros.append(f"{usuario}: {e}")
+            continue
+
+        # servidor anuncia 8BITMIME → corpo vai em UTF-8 cru
+        conexoes[usuario] = {
+            "smtp": smtp,
+            "oito_bits": smtp.has_extn("8bitmime"),
+            "enviados": 0,
+            "usada_em": time.monotonic(),
+        }
+        contas.append((usuario, senha))
+
+    return contas, conexoes, erros
+
+
+# --------------------------------------------------
+# EXECUÇÃO (UMA MENSAGEM POR PASSO)
+# O agendador devolve o próximo job pronto; o passo envia
+# a próxima mensagem dele e devolve o job para a raia com
+# o horário da mensagem seguinte. Conexões, pacote .eml e
+# perfil do job ficam em _execucoes até ele terminar.
+#
+# iniciar_execucao, enviar_item, enviar_resumo e
+# encerrar_execucao são o caminho comum deste worker e
+# dos processos do worker.py.
+# --------------------------------------------------
+def iniciar_execucao(job):
+    contas, conexoes, erros = _conectar_contas(job)
+
+    if not contas:
+        job["erro"] = "Erro de conexão SMTP: " + "; ".join(erros)
+        return None
+
+    if erros:
+        job["avisos"].extend(erros)
+
+    return {
+        "contas": contas,
+        "senhas": dict(contas),
+        "conexoes": conexoes,
+        "pacote": resumo_envio.novo_pacote() if job["anexar_eml"] else None,
+        "proxima": 0,
+        # falhas já ocorridas na mensagem atual / no resumo
+        "tentativa": 0,
+        "tentativa_resumo": 0,
+    }
+
+
+def encerrar_execucao(execucao):
+    for conexao in execucao["conexoes"].values():
+        _fechar(conexao["smtp"])
+
+
+def _reconectar(execucao, usuario):
+    conexao = execucao["conexoes"][usuario]
+    _fechar(conexao["smtp"])
+    conexao["smtp"] = _conectar(usuario, execucao["senhas"][usuario])
+    conexao["usada_em"] = time.monotonic()
+
+
+def enviar_item(execucao, item, avisos, tentativa=0, reservada=None):
+    # tentativa = falhas anteriores desta mensagem
+    # reservada = conta escolhida pela fila dentro da cota
+    #             compartilhada (worker.py)
+    # → {"situacao": "enviada", "usuario", "bytes", "msg"}
+    #   {"situacao": "falha", "erro"}
+    #   {"situacao": "aguardar", "espera", "tentativa"} nenhuma conta com cota agora
+    #   {"situacao": "repetir", "espera", "tentativa"} falhou, tentar de novo depois
+    #   RelayIndisponivel se nenhum servidor SMTP responde
+    contas = execucao["contas"]
+
+    erro_envio = None
+
+    while tentativa < TENTATIVAS:
+
+        conta = next(
+            (c for c in contas if c[0] == reservada and remetentes.disponivel(c[0])),
+            None
+        ) or remetentes.escolher_conta(contas, item)
+
+        # todas as contas sem cota: o job volta para a raia
+        # e outros jobs seguem enviando enquanto isso
+        if conta is None:
+            return {
+                "situacao": "aguardar",
+                "espera": max(remetentes.espera_liberacao(contas), 1),
+                "tentativa": tentativa,
+            }
+
+        usuario = conta[0]
+        conexao = execucao["conexoes"][usuario]
+
+        # conexão parada desde a última mensagem (job
+        # espalhado / intercalado): o servidor já a derrubou
+        if time.monotonic() - conexao["usada_em"] > OCIOSA_S:
+            _reconectar(execucao, usuario)
+
+        msg = montar_mensagem(item, usuario, conexao["oito_bits"])
+        opcoes = ["BODY=8BITMIME"] if usa_oito_bits(msg) else []
+        tamanho = len(msg.as_bytes())
+
+        try:
+            conexao["smtp"].send_message(
+                msg,
+                to_addrs=item["para"] + item["cc"],
+                mail_options=opcoes
+            )
+            conexao["usada_em"] = time.monotonic()
+            break
+
+        except Exception as e:
+            erro_envio = e
+            repetir = False
+
+            # servidor caiu: a falha conta contra ele e a
+            # reconexão abaixo já vai para um servidor saudável
+            if relays.eh_falha_de_rede(e):
+                relays.registrar_falha(getattr(conexao["smtp"], "relay", None), e)
+                tentativa += 1
+
+            # conta limitada pelo provedor: bloqueia e a
+            # mensagem vai para a próxima conta do anel
+            elif remetentes.eh_limite(e) and len(contas) > 1:
+                remetentes.bloquear(usuario)
+                avisos.append(f"{usuario}: limite do provedor ({e})")
+            else:
+                tentativa += 1
+                repetir = tentativa < TENTATIVAS
+
+            # reconecta SMTP
+            try:
+                _reconectar(execucao, usuario)
+            except relays.RelayIndisponivel:
+                raise
+            except Exception as e:
+                erro_envio = e
+
+            # espera antes de tentar novamente: a mensagem volta
+            # para a raia e o worker segue com os outros jobs
+            if repetir:
+                return {"situacao": "repetir", "espera": 5 * tentativa, "tentativa": tentativa}
+
+    else:
+        return {"situacao": "falha", "erro": str(erro_envio)}
+
+    remetentes.registrar_envio(usuario)
+    conexao["enviados"] += 1
+
+    # reconecta a cada 20 envios (na próxima mensagem da conta)
+    if conexao["enviados"] % RECONECTAR_A_CADA == 0:
+        _fechar(conexao["smtp"])
+        conexao["usada_em"] = float("-inf")
+
+    return {"situacao": "enviada", "usuario": usuario, "bytes": tamanho, "msg": msg}
+
+
+def _registrar(job, execucao, item, resultado):
+    if resultado["situacao"] == "falha":
+        job["falhas"].append({**item["log"], "Erro": resultado["erro"]})
+        return
+
+    usuario = resultado["usuario"]
+
+    job["enviados"] += 1
+    job["bytes"] += resultado["bytes"]
+    job["por_conta"][usuario] = job["por_conta"].get(usuario, 0) + 1
+    job["log"].append({**item["log"], "Remetente": usuario, "Bytes": resultado["bytes"]})
+    resumo_envio.adicionar_eml(execucao["pacote"], resultado["msg"], item["assunto"])
+
+
+def _passo(job):
+    execucao = _execucoes.get(job["id"])
+
+    # resumo para o CC aguardando nova tentativa
+    if job["status"] == "finalizando":
+        _finalizar(job, execucao)
+        return
+
+    try:
+        if execucao is None:
+            execucao = iniciar_execucao(job)
+
+            if execucao is None:
+                _finalizar(job, None)
+                return
+
+            _execucoes[job["id"]] = execucao
+
+        if execucao["proxima"] < len(job["mensagens"]):
+            item = job["mensagens"][execucao["proxima"]]
+            resultado = enviar_item(
+                execucao, item, job["avisos"], execucao["tentativa"]
+            )
+
+            if resultado["situacao"] in ("aguardar", "repetir"):
+                execucao["tentativa"] = resultado["tentativa"]
+                agenda.agendar(
+                    job["id"], job["prioridade"], time.time() + resultado["espera"]
+                )
+                return
+
+            execucao["tentativa"] = 0
+            _registrar(job, execucao, item, resultado)
+            execucao["proxima"] += 1
+            job["status"] = "enviando"
+            job["aguardando_desde"] = None
+
+        if execucao["proxima"] < len(job["mensagens"]):
+            # pausa / espalhamento entre mensagens do job;
+            # outras raias usam o SMTP nesse intervalo
+            agenda.agendar(
+                job["id"], job["prioridade"], time.time() + job["intervalo"]
+            )
+            return
+
+    except relays.RelayIndisponivel as e:
+        # servidores fora do ar: o job espera na raia (sem gastar
+        # tentativas nem travar o worker) até MAX_ESPERA_SERVIDOR_S
+        if job["aguardando_desde"] is None:
+            job["aguardando_desde"] = time.time()
+
+        if time.time() - job["aguardando_desde"] < MAX_ESPERA_SERVIDOR_S:
+            job["status"] = "aguardando servidor"
+            agenda.agendar(job["id"], job["prioridade"], time.time() + e.espera)
+            return
+
+        job["erro"] = (
+            f"Servidor SMTP indisponível há mais de "
+            f"{MAX_ESPERA_SERVIDOR_S // 60} min: {e}"
+        )
+
+    except Exception as e:
+        job["erro"] = f"Erro no envio: {e}"
+
+    _finalizar(job, execucao)
+
+
+def enviar_resumo(job, execucao):
+    # uma tentativa por chamada
+    # → segundos até a próxima tentativa, ou None (enviado / desistiu)
+    item = resumo_envio.mensagem_resumo(job, execucao["pacote"])
+    usuario = (remetentes.escolher_conta(execucao["contas"], item) or execucao["contas"][0])[0]
+
+    try:
+        conexao = execucao["conexoes"][usuario]
+        if time.monotonic() - conexao["usada_em"] > OCIOSA_S:
+            _reconectar(execucao, usuario)
+
+        msg = montar_mensagem(item, usuario, conexao["oito_bits"])
+        conexao["smtp"].send_message(
+            msg,
+            to_addrs=item["para"],
+            mail_options=["BODY=8BITMIME"] if usa_oito_bits(msg) else []
+        )
+        remetentes.registrar_envio(usuario)
+        job["resumo"] = "enviado"
+        return None
+
+    except Exception as e:
+        erro = e
+        try:
+            _reconectar(execucao, usuario)
+        except Exception as e:
+            erro = e
+
+    execucao["tentativa_resumo"] += 1
+    if execucao["tentativa_resumo"] < TENTATIVAS:
+        return 5 * execucao["tentativa_resumo"]
+
+    job["resumo"] = f"não enviado: {erro}"
+    job["avisos"].append(f"Resumo para o CC não enviado: {erro}")
+    return None
+
+
+def _finalizar(job, execucao):
+    if execucao is not None:
+        # resumo vai mesmo se o job parou no meio; o job só
+        # aparece como concluído depois dessa tentativa
+        if job["cc_resumo"] and job["resumo"] is None:
+            job["status"] = "finalizando"
+            espera = enviar_resumo(job, execucao)
+
+            # nova tentativa mais tarde, sem travar as raias
+            if espera is not None:
+                _execucoes[job["id"]] = execucao
+                agenda.agendar(job["id"], job["prioridade"], time.time() + espera)
+                return
+
+        encerrar_execucao(execucao)
+
+    _execucoes.pop(job["id"], None)
+    confirmar_entrega(job)
+
+    job["status"] = "erro" if job["erro"] else "concluído"
+    job["terminado_em"] = time.time()
+
+    # credenciais e corpos não ficam na memória
+    # depois que o job termina
+    job["senha"] = None
+    job["contas"] = []
+    job["mensagens"] = []
+
+    perfil.encerrar(_perfis.pop(job["id"], None))
+
+
+def confirmar_entrega(job):
+    # foto do delta só com as unidades que receberam o e-mail
+    import delta
+
+    try:
+        delta.confirmar_entrega(job)
+    except Exception as e:
+        job["avisos"].append(f"Foto do modo delta não atualizada: {e}")
+
+
+def _loop():
+    while True:
+        job = obter_job(agenda.proximo())
+
+        if job["perfil"] and job["id"] not in _perfis:
+            _perfis[job["id"]] = perfil.novo(f"envio_{job['id']}")
+
+        with perfil.trecho(_perfis.get(job["id"])):
+            _passo(job)
+
+
+def _garantir_worker():
+    global _worker
+
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_loop,
+                name="automailer-envio",
+                daemon=True
+            )
+            _worker.start()
+
+
+# --------------------------------------------------
+# PAINEL DE ENVIOS (UI)
+# --------------------------------------------------
+def opcoes_copia(chave):
+    # CC em cada mensagem (padrão) ou um único resumo no fim
+    cc_resumo = st.checkbox(
+        "📋 CC recebe só um resumo no fim (sem cópia em cada e-mail)",
+        key=f"{chave}_cc_resumo"
+    )
+
+    anexar_eml = cc_resumo and st.checkbox(
+        "📦 Anexar ao resumo as mensagens enviadas (.eml em .zip)",
+        key=f"{chave}_cc_eml"
+    )
+
+    return cc_resumo, anexar_eml
+
+
+def registrar_job_na_sessao(job_id):
+    st.session_state.setdefault("jobs_envio", []).append(job_id)
+
+    # recarrega a página para o job aparecer no painel
+    st.rerun()
+
+
+def _mostrar_job(job):
+    total = job["total"] or 1
+    processados = job["enviados"] + len(job["falhas"])
+
+    st.markdown(
+        f"**{job['descricao']}** · job `{job['id']}` · "
+        f"{job['criado_em']:%d/%m %H:%M} · {job['status']}"
+        f" · raia {agenda.NOMES_RAIAS[job['prioridade']]}"
+    )
+
+    if job["status"] == "agendado":
+        st.caption(f"⏰ Início em {datetime.fromtimestamp(job['inicio']):%d/%m %H:%M}")
+    st.progress(min(processados / total, 1.0))
+    st.caption(
+        f"📧 E-mails enviados: {job['enviados']} / {job['total']}"
+        f" · ❌ Falhas: {len(job['falhas'])}"
+        f" · 📦 {job['bytes'] / 1024:.0f} KB"
+        f" ({job['bytes'] / max(job['enviados'], 1) / 1024:.1f} KB/e-mail)"
+    )
+
+    if job["cc_resumo"]:
+        st.caption(
+            "📋 Resumo no fim para: " + ", ".join(job["cc_resumo"])
+            + (f" · {job['resumo']}" if job["resumo"] else "")
+        )
+
+    if len(job["por_conta"]) > 1:
+        st.caption("👥 " + " · ".join(
+            f"{usuario}: {qtd}" for usuario, qtd in job["por_conta"].items()
+        ))
+
+    if job["erro"]:
+        st.error(job["erro"])
+
+    for aviso in job["avisos"][-5:]:
+        st.warning(aviso)
+
+    if job["status"] in ("concluído", "erro"):
+        import pandas as pd
+
+        with st.expander("📄 Log de envio"):
+            if job["log"]:
+                st.dataframe(pd.DataFrame(job["log"]), hide_index=True)
+
+            if job["sem_email"]:
+                st.warning("⚠️ Sem e-mail cadastrado:")
+                st.write(sorted(set(job["sem_email"])))
+
+            if job["rejeitadas"]:
+                st.warning("⚠️ Não enviadas (destinatários inválidos)")
+                st.dataframe(pd.DataFrame(job["rejeitadas"]), hide_index=True)
+
+            if job["falhas"]:
+                st.error("❌ Falha no envio")
+                st.dataframe(pd.DataFrame(job["falhas"]), hide_index=True)
+
+
+def _algum_ativo(jobs):
+    return any(job["status"] in STATUS_ATIVOS for job in jobs)
+
+
+def painel_jobs(email_user, senha):
+    jobs = jobs_do_usuario(
+        email_user, senha, st.session_state.get("jobs_envio", [])
+    )
+    if not jobs:
+        return
+
+    atualizando = _algum_ativo(jobs)
+
+    def _painel():
+        jobs = jobs_do_usuario(
+            email_user, senha, st.session_state.get("jobs_envio", [])
+        )
+        ativos = _algum_ativo(jobs)
+
+        # último job terminou: página recarregada uma vez para o
+        # fragmento voltar sem run_every (painel para de consultar)
+        if atualizando and not ativos and hasattr(st, "fragment"):
+            st.rerun()
+
+        st.subheader("📬 Envios")
+
+        if fila.ativa() and ativos and not fila.workers_ativos():
+            st.warning(
+                "⚙️ Nenhum worker de envio ativo: os jobs ficam na fila "
+                "até algum `python worker.py` ser iniciado."
+            )
+
+        # com a fila, a saúde dos servidores fica nos workers
+        for relay in [] if fila.ativa() else relays.situacao():
+            if relay["estado"] != "ok":
+                st.warning(
+                    f"🔌 Servidor {relay['servidor']} fora do ar "
+                    f"({relay['ultimo_erro']}); usando o próximo disponível."
+                )
+
+        for job in jobs:
+            _mostrar_job(job)
+
+        if ativos and not hasattr(st, "fragment"):
+            st.button("🔄 Atualizar envios")
+
+    # atualiza sozinho enquanto houver job andando
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=2 if atualizando else None)(_painel)()
+    else:
+        _painel()
@@ -0,0 +1,226 @@
+import pandas as pd
+
+from leitura import ler_planilha
+
+# --------------------------------------------------
+# ESQUEMAS DAS ENTRADAS DE CADA FLUXO
+# Cada fluxo declara as colunas que usa (posição na
+# planilha ou nome no cabeçalho), o nome no frame e o tipo:
+#   "texto"      lido como str, sem inferência (códigos e
+#                ordens não viram 123.0)
+#   "categoria"  texto repetido (unidade, status...); depois
+#                passa por normalizar_categorias
+#   "data"       data no formato explícito do esquema
+#   "decimal"    número com milhar "." e decimal ","
+#   "numero"     número simples ("12", "3.5")
+#   None         valor como vem da planilha (datas do Excel
+#                já chegam tipadas)
+#
+# usecols / names / dtype vão direto para o leitor e layout
+# errado vira LayoutInvalido antes de qualquer processamento.
+# --------------------------------------------------
+TIPOS_TEXTO = ("texto", "categoria")
+
+
+class LayoutInvalido(ValueError):
+
+    def __init__(self, esquema, arquivo, problemas):
+        super().__init__(
+            f"{arquivo}: não parece {esquema['descricao']} ("
+            + "; ".join(problemas) + ")"
+        )
+        self.problemas = problemas
+
+
+# exportação do TMS: A,B,C,D,G,H,J,O,Q,R,S
+# (nomes = colunas da tabela do e-mail)
+TMS = {
+    "descricao": "uma exportação do TMS",
+    "linha_cabecalho": 1,
+    "colunas": [
+        (0, "Codigo", "texto"),
+        (1, "Nota Fiscal", "texto"),
+        (2, "Pedido", "texto"),
+        (3, "Cliente", "texto"),
+        (6, "Destino", "categoria"),
+        (7, "Cidade", "texto"),
+        (9, "UF", "texto"),
+        (14, "Status", "categoria"),
+        (16, "Dt Evento", None),
+        (17, "Previsao", None),
+        (18, "Descrição", "categoria"),
+    ],
+}
+
+# planilha RE das coletas Arcos (12 colunas, A1 == "RE"):
+# só SIGLA, ORDEM e UNIDADE são usadas no envio
+ARCOS = {
+    "descricao": "a planilha RE das coletas Arcos",
+    "linha_cabecalho": 0,
+    "colunas": [
+        (1, "SIGLA", "texto"),
+        (5, "ORDEM", "texto"),
+        (10, "UNIDADE", "categoria"),
+    ],
+}
+
+# planilha de coleta (A2 == "ORDEM"): todas as colunas vão
+# para o e-mail; ORDEM e ORIGEM são obrigatórias
+COLETA = {
+    "descricao": "a planilha de coleta",
+    "linha_cabecalho": 1,
+    "colunas": [
+        ("ORDEM", "ORDEM", "texto"),
+        ("ORIGEM", "ORIGEM", "categoria"),
+    ],
+}
+
+# TXT da Central de Pedidos (parse_txt separa as colunas)
+PEDIDOS_TXT = {
+    "descricao": "um TXT da Central de Pedidos",
+    "formato_data": "%d/%m/%Y",
+    "colunas": [
+        (0, "RESTAURANTE", "texto"),
+        (1, "PEDIDO", "texto"),
+        (2, "DATA", "data"),
+        (3, "ITEM", "texto"),
+        (4, "QTDE", "numero"),
+        (5, "DESCRICAO", "texto"),
+        (6, "PRECO_UNIT_RS", "decimal"),
+        (7, "PRECO_UNIT_USD", "decimal"),
+        (8, "RESPONSAVEL", "texto"),
+        (9, "OBSERVACAO", "texto"),
+        (10, "OC", "texto"),
+        (11, "CNPJ", "texto"),
+    ],
+}
+
+
+def nomes(esquema):
+    return [nome for _, nome, _ in esquema["colunas"]]
+
+
+def _dtype_texto(arquivo):
+    # no .csv tudo já chega como texto: object direto; no
+    # Excel, str converte número para texto ("123", não 123.0)
+    return object if arquivo.name.lower().endswith(".csv") else str
+
+
+def _textos_como_object(df, colunas):
+    # o str do pandas 3 (arrow) deixa o df.iloc por unidade
+    # bem mais lento: os valores seguem como object
+    colunas = [nome for nome in colunas if df[nome].dtype != object]
+    if not colunas:
+        return df
+    return df.astype({nome: object for nome in colunas})
+
+
+def _letra(posicao):
+    letras = ""
+    posicao += 1
+    while posicao:
+        posicao, resto = divmod(posicao - 1, 26)
+        letras = chr(ord("A") + resto) + letras
+    return letras
+
+
+# --------------------------------------------------
+# LEITURA POSICIONAL (TMS, ARCOS)
+# cabeçalho do arquivo é ignorado: vários arquivos da
+# mesma exportação saem com as mesmas colunas
+# --------------------------------------------------
+def ler(arquivo, esquema):
+    colunas = esquema["colunas"]
+
+    try:
+        df = ler_planilha(
+            arquivo,
+            header=None,
+            skiprows=esquema["linha_cabecalho"] + 1,
+            usecols=[posicao for posicao, _, _ in colunas],
+            names=nomes(esquema),
+            dtype={
+                nome: _dtype_texto(arquivo)
+                for _, nome, tipo in colunas if tipo in TIPOS_TEXTO
+            },
+        )
+    except ValueError as e:
+        # usecols fora da planilha (ParserError herda de ValueError)
+        ultima = max(posicao for posicao, _, _ in colunas)
+        raise LayoutInvalido(
+            esquema,
+            arquivo.name,
+            [f"são necessárias colunas até a {_letra(ultima)}"]
+        ) from e
+
+    if df.empty:
+        raise LayoutInvalido(esquema, arquivo.name, ["nenhuma linha de dados"])
+
+    return _textos_como_object(
+        df, [nome for _, nome, tipo in colunas if tipo == "texto"]
+    )
+
+
+# --------------------------------------------------
+# LEITURA POR NOME (COLETA)
+# mantém as demais colunas como vierem
+# --------------------------------------------------
+def ler_por_nome(arquivo, esquema):
+    # uma leitura só: dtype pelo nome exato do cabeçalho
+    # (nome ausente é ignorado pelo pandas) e validação
+    # depois de normalizar os nomes
+    df = ler_planilha(
+        arquivo,
+        header=esquema["linha_cabecalho"],
+        dtype={
+            nome: _dtype_texto(arquivo)
+            for nome, _, tipo in esquema["colunas"] if tipo in TIPOS_TEXTO
+        },
+    )
+
+    df.columns = df.columns.astype(str).str.strip().str.upper()
+
+    faltando = [nome for nome, _, _ in esquema["colunas"] if nome not in df.columns]
+    if faltando:
+        raise LayoutInvalido(
+            esquema, arquivo.name, ["sem a(s) coluna(s) " + ", ".join(faltando)]
+        )
+
+    return _textos_como_object(
+        df, [nome for nome, _, tipo in esquema["colunas"] if tipo == "texto"]
+    )
+
+
+# --------------------------------------------------
+# CONVERSÃO COM FORMATO EXPLÍCITO (TXT)
+# → [(coluna, qtd inválida, exemplos)] para aviso
+# --------------------------------------------------
+def converter(df, esquema):
+    problemas = []
+
+    for _, nome, tipo in esquema["colunas"]:
+        bruto = df[nome]
+
+        if tipo == "data":
+            convertido = pd.to_datetime(
+                bruto, format=esquema["formato_data"], errors="coerce"
+            )
+        elif tipo == "decimal":
+            convertido = pd.to_numeric(
+                bruto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+                errors="coerce"
+            )
+        elif tipo == "numero":
+            convertido = pd.to_numeric(bruto, errors="coerce")
+        else:
+            continue
+
+        invalidos = convertido.isna() & bruto.notna()
+        if invalidos.any():
+            problemas.append(
+                (nome, int(invalidos.sum()), bruto[invalidos].unique()[:3].tolist())
+            )
+
+        df[nome] = convertido
+
+    return problemas
@@ -0,0 +1,565 @@
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import remetentes
+
+# --------------------------------------------------
+# FILA COMPARTILHADA DE ENVIO (SQLite)
+# Com AUTOMAILER_FILA apontando para um arquivo .db, os
+# fluxos só gravam o job aqui e quem envia são os
+# processos do worker.py (N por máquina; várias máquinas
+# com o arquivo num disco compartilhado). Sem a variável,
+# o worker em thread do envio.py faz o papel da fila.
+#
+# Cada mensagem é alugada por um worker (lease) com prazo
+# LEASE_S, renovado pelo heartbeat. Worker que morre deixa
+# o aluguel vencer e a mensagem volta para a fila; depois
+# de MAX_ALUGUEIS aluguéis vencidos ela vira falha.
+#
+# O arquivo pode estar num disco compartilhado, então:
+#   - senhas não vão para ele: cada conta do job vai como
+#     usuário + HMAC da credencial (chave AUTOMAILER_SEGREDO,
+#     fora do arquivo) e o worker usa a senha da própria
+#     configuração (ver worker.py)
+#   - mensagens vão em JSON, nunca pickle: quem escreve
+#     no arquivo não executa código nos workers
+#   - cada anexo é gravado uma vez (tabela anexos, mesmo
+#     PDF em várias mensagens) e o worker só lê os bytes
+#     quando a mensagem sai
+# Cota por hora das contas (remetentes.LIMITE_POR_HORA):
+# a conta é reservada na mesma transação que aluga a
+# mensagem (remetente + enviado_em), contando os envios
+# de todos os workers na tabela de mensagens.
+#
+# Corpos ficam no arquivo só enquanto o job está aberto;
+# o arquivo é criado com permissão 0600.
+# --------------------------------------------------
+CAMINHO = os.environ.get("AUTOMAILER_FILA", "")
+
+# WAL exige que todos os processos estejam na mesma máquina;
+# com o arquivo num disco de rede use AUTOMAILER_FILA_WAL=0
+WAL = os.environ.get("AUTOMAILER_FILA_WAL", "1") != "0"
+
+LEASE_S = 120
+HEARTBEAT_S = 30
+MAX_ALUGUEIS = 3
+
+# job terminado fica no painel (e no arquivo) por este tempo;
+# depois sai com as mensagens no fechamento de outro job
+GUARDAR_JOBS_S = 24 * 3600
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    descricao TEXT,
+    usuario TEXT,
+    credencial TEXT,
+    contas TEXT,
+    prioridade INTEGER,
+    inicio REAL,
+    cc_resumo TEXT,
+    anexar_eml INTEGER,
+    status TEXT,
+    criado_em TEXT,
+    total INTEGER,
+    rejeitadas TEXT,
+    sem_email TEXT,
+    avisos TEXT DEFAULT '[]',
+    erro TEXT,
+    resumo TEXT,
+    terminado_em REAL
+);
+
+CREATE TABLE IF NOT EXISTS mensagens (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT,
+    ordem INTEGER,
+    prioridade INTEGER,
+    pronto_em REAL,
+    situacao TEXT DEFAULT 'pendente',
+    worker TEXT,
+    lease_ate REAL,
+    alugueis INTEGER DEFAULT 0,
+    tentativas INTEGER DEFAULT 0,
+    assunto TEXT,
+    item TEXT,
+    log TEXT,
+    remetente TEXT,
+    enviado_em REAL,
+    bytes INTEGER,
+    erro TEXT,
+    eml BLOB
+);
+
+CREATE INDEX IF NOT EXISTS mensagens_prontas
+    ON mensagens (situacao, prioridade, pronto_em);
+
+CREATE INDEX IF NOT EXISTS mensagens_job ON mensagens (job_id, situacao);
+
+CREATE INDEX IF NOT EXISTS mensagens_remetente ON mensagens (remetente, enviado_em);
+
+CREATE TABLE IF NOT EXISTS anexos (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT,
+    conteudo BLOB
+);
+
+CREATE INDEX IF NOT EXISTS anexos_job ON anexos (job_id);
+
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    visto_em REAL
+);
+"""
+
+_local = threading.local()
+
+
+def ativa():
+    return bool(CAMINHO)
+
+
+def _db():
+    db = getattr(_local, "db", None)
+
+    if db is None:
+        if not os.path.exists(CAMINHO):
+            os.close(os.open(CAMINHO, os.O_CREAT | os.O_WRONLY, 0o600))
+
+        db = sqlite3.connect(CAMINHO, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute(f"PRAGMA journal_mode={'WAL' if WAL else 'DELETE'}")
+        db.executescript(ESQUEMA)
+        _local.db = db
+
+    return db
+
+
+class _transacao:
+    # BEGIN IMMEDIATE: um worker por vez decide o aluguel
+
+    def __enter__(self):
+        self.db = _db()
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, tipo, *_):
+        self.db.execute("ROLLBACK" if tipo else "COMMIT")
+
+
+def _gravar_anexos(db, job_id, item, gravados):
+    # → [(nome, id na tabela anexos)]; gravados = {id(conteúdo): id}
+    # para o mesmo PDF de várias mensagens ir uma vez só
+    referencias = []
+
+    for nome, conteudo in item.get("anexos") or ():
+        if id(conteudo) not in gravados:
+            dados = conteudo() if callable(conteudo) else conteudo
+            gravados[id(conteudo)] = db.execute(
+                "INSERT INTO anexos (job_id, conteudo) VALUES (?, ?)",
+                (job_id, dados)
+            ).lastrowid
+        referencias.append((nome, gravados[id(conteudo)]))
+
+    return referencias
+
+
+def _item_json(item, referencias):
+    return json.dumps({**item, "anexos": referencias}, default=str)
+
+
+def _ler_anexo(anexo_id):
+    linha = _db().execute(
+        "SELECT conteudo FROM anexos WHERE id = ?", (anexo_id,)
+    ).fetchone()
+    return bytes(linha["conteudo"])
+
+
+def _item_de_json(texto):
+    # anexos voltam como (nome, ler): bytes lidos só na montagem
+    item = json.loads(texto)
+    item["anexos"] = [
+        (nome, functools.partial(_ler_anexo, anexo_id))
+        for nome, anexo_id in item["anexos"]
+    ]
+    return item
+
+
+# --------------------------------------------------
+# PUBLICAÇÃO (FLUXOS)
+# job["contas"] = [(usuario, hash da credencial)]
+# --------------------------------------------------
+def publicar(job):
+    inicio = job["inicio"] or time.time()
+
+    with _transacao() as db:
+        db.execute(
+            """INSERT INTO jobs (id, descricao, usuario, credencial, contas,
+                   prioridade, inicio, cc_resumo, anexar_eml, status,
+                   criado_em, total, rejeitadas, sem_email)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                job["id"], job["descricao"], job["usuario"], job["credencial"],
+                json.dumps(job["contas"]), job["prioridade"], job["inicio"],
+                json.dumps(job["cc_resumo"]), int(job["anexar_eml"]), job["status"],
+                job["criado_em"].isoformat(), job["total"],
+                json.dumps(job["rejeitadas"], default=str),
+                json.dumps(job["sem_email"], default=str),
+            )
+        )
+
+        # espaçamento do job vira o horário de cada mensagem,
+        # assim vários workers respeitam a pausa / espalhamento
+        gravados = {}
+        db.executemany(
+            """INSERT INTO mensagens (job_id, ordem, prioridade, pronto_em,
+                   assunto, log, item)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (job["id"], i, job["prioridade"], inicio + i * job["intervalo"],
+                 item["assunto"], json.dumps(item["log"], default=str),
+                 _item_json(item, _gravar_anexos(db, job["id"], item, gravados)))
+                for i, item in enumerate(job["mensagens"])
+            ]
+        )
+
+
+# --------------------------------------------------
+# CONSUMO (WORKERS)
+# --------------------------------------------------
+def _uso_ultima_hora(db, usuarios, agora):
+    # envios (e reservas em andamento) de cada conta na última
+    # hora, somando todos os jobs e workers
+    marcadores = ",".join("?" * len(usuarios))
+
+    linhas = db.execute(
+        f"""SELECT remetente, COUNT(*) AS qtd, MIN(enviado_em) AS primeiro
+            FROM mensagens
+            WHERE remetente IN ({marcadores}) AND enviado_em > ?
+            GROUP BY remetente""",
+        (*usuarios, agora - 3600)
+    ).fetchall()
+
+    uso = {linha["remetente"]: linha["qtd"] for linha in linhas}
+    # primeira vaga que abre entre as contas
+    liberacao = min((linha["primeiro"] + 3600 for linha in linhas), default=agora)
+
+    return uso, liberacao
+
+
+def reivindicar(worker, prioridades):
+    # próxima mensagem pronta da raia mais prioritária
+    agora = time.time()
+    marcadores = ",".join("?" * len(prioridades))
+
+    with _transacao() as db:
+        while True:
+            linha = db.execute(
+                f"""SELECT m.id, m.job_id, m.ordem, m.tentativas, m.item, j.contas
+                    FROM mensagens m JOIN jobs j ON j.id = m.job_id
+                    WHERE m.situacao = 'pendente' AND m.pronto_em <= ?
+                      AND m.prioridade IN ({marcadores})
+                    ORDER BY m.prioridade, m.pronto_em, m.id LIMIT 1""",
+                (agora, *prioridades)
+            ).fetchone()
+
+            if linha is None:
+                return None
+
+            item = _item_de_json(linha["item"]) if linha["item"] else None
+            contas = json.loads(linha["contas"] or "[]")
+            reservada = None
+
+            if remetentes.LIMITE_POR_HORA and item is not None and contas:
+                uso, liberacao = _uso_ultima_hora(db, [u for u, _ in contas], agora)
+                conta = remetentes.escolher_conta(contas, item, uso)
+
+                # nenhuma conta do job com cota: o job inteiro espera
+                # a primeira vaga e a busca segue para a próxima mensagem
+                if conta is None:
+                    db.execute(
+                        """UPDATE mensagens SET pronto_em = MAX(pronto_em, ?)
+                           WHERE job_id = ? AND situacao = 'pendente'""",
+                        (max(liberacao, agora + 1), linha["job_id"])
+                    )
+                    continue
+
+                reservada = conta[0]
+
+            break
+
+        db.execute(
+            """UPDATE mensagens SET situacao = 'alugada', worker = ?,
+                   lease_ate = ?, alugueis = alugueis + 1,
+                   remetente = ?, enviado_em = ?
+               WHERE id = ?""",
+            (worker, agora + LEASE_S, reservada, agora if reservada else None, linha["id"])
+        )
+        db.execute(
+            """UPDATE jobs SET status = 'enviando'
+               WHERE id = ? AND status NOT IN ('enviando', 'concluído', 'erro')""",
+            (linha["job_id"],)
+        )
+
+    return {
+        "id": linha["id"],
+        "job_id": linha["job_id"],
+        "ordem": linha["ordem"],
+        "tentativas": linha["tentativas"],
+        "remetente": reservada,
+        "item": item,
+    }
+
+
+def adiar(mensagem_id, quando, status=None, tentativas=None):
+    # sem cota / sem servidor / nova tentativa depois de uma
+    # falha: volta para a fila sem contar aluguel
+    with _transacao() as db:
+        db.execute(
+            """UPDATE mensagens SET situacao = 'pendente', worker = NULL,
+                   pronto_em = ?, alugueis = alugueis - 1,
+                   tentativas = COALESCE(?, tentativas),
+                   remetente = NULL, enviado_em = NULL
+               WHERE id = ? AND situacao = 'alugada'""",
+            (quando, tentativas, mensagem_id)
+        )
+
+        if status:
+            db.execute(
+                """UPDATE jobs SET status = ?
+                   WHERE id = (SELECT job_id FROM mensagens WHERE id = ?)""",
+                (status, mensagem_id)
+            )
+
+
+def heartbeat(worker):
+    agora = time.time()
+
+    with _transacao() as db:
+        db.execute(
+            "INSERT OR REPLACE INTO workers (id, host, pid, visto_em) VALUES (?, ?, ?, ?)",
+            (worker, socket.gethostname(), os.getpid(), agora)
+        )
+        db.execute(
+            """UPDATE mensagens SET lease_ate = ?
+               WHERE worker = ? AND situacao = 'alugada'""",
+            (agora + LEASE_S, worker)
+        )
+
+
+def recolocar_vencidas():
+    # aluguel vencido = worker morreu / travou
+    agora = time.time()
+
+    with _transacao() as db:
+        db.execute(
+            """UPDATE mensagens SET situacao = 'falha', item = NULL,
+                   remetente = NULL, enviado_em = NULL,
+                   erro = 'worker parou de responder ' || alugueis || ' vezes'
+               WHERE situacao = 'alugada' AND lease_ate < ? AND alugueis >= ?""",
+            (agora, MAX_ALUGUEIS)
+        )
+        recolocadas = db.execute(
+            """UPDATE mensagens SET situacao = 'pendente', worker = NULL,
+                   remetente = NULL, enviado_em = NULL
+               WHERE situacao = 'alugada' AND lease_ate < ?""",
+            (agora,)
+        ).rowcount
+
+    return recolocadas
+
+
+def concluir(mensagem_id, resultado, eml=None):
+    with _transacao() as db:
+        if resultado["situacao"] == "enviada":
+            db.execute(
+                """UPDATE mensagens SET situacao = 'enviada', remetente = ?,
+                       enviado_em = ?, bytes = ?, eml = ?, item = NULL
+                   WHERE id = ?""",
+                (resultado["usuario"], time.time(), resultado["bytes"], eml, mensagem_id)
+            )
+        else:
+            db.execute(
+                """UPDATE mensagens SET situacao = 'falha', erro = ?, item = NULL,
+                       remetente = NULL, enviado_em = NULL
+                   WHERE id = ?""",
+                (resultado["erro"], mensagem_id)
+            )
+
+
+def avisar(job_id, texto):
+    with _transacao() as db:
+        linha = db.execute("SELECT avisos FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        avisos = json.loads(linha["avisos"]) + [texto]
+        db.execute(
+            "UPDATE jobs SET avisos = ? WHERE id = ?",
+            (json.dumps(avisos[-50:]), job_id)
+        )
+
+
+def abortar(job_id, erro):
+    # mensagens ainda não enviadas viram falha; o
+    # fechamento do job (resumo etc.) segue normal
+    with _transacao() as db:
+        db.execute("UPDATE jobs SET erro = ? WHERE id = ?", (erro, job_id))
+        db.execute(
+            """UPDATE mensagens SET situacao = 'falha', erro = ?, item = NULL,
+                   remetente = NULL, enviado_em = NULL
+               WHERE job_id = ? AND situacao IN ('pendente', 'alugada')""",
+            (erro, job_id)
+        )
+
+
+# --------------------------------------------------
+# FECHAMENTO DO JOB
+# um único worker pega o job sem mensagens abertas
+# (inclusive as que viraram falha por aluguel vencido),
+# manda o resumo e limpa o que é sensível
+# --------------------------------------------------
+def reivindicar_fechamento():
+    with _transacao() as db:
+        linha = db.execute(
+            """SELECT id FROM jobs j
+               WHERE status NOT IN ('concluído', 'erro', 'finalizando')
+                 AND NOT EXISTS (
+                     SELECT 1 FROM mensagens m
+                     WHERE m.job_id = j.id AND m.situacao IN ('pendente', 'alugada')
+                 )
+               LIMIT 1"""
+        ).fetchone()
+
+        if linha is None:
+            return None
+
+        db.execute(
+            "UPDATE jobs SET status = 'finalizando' WHERE id = ?", (linha["id"],)
+        )
+
+    return linha["id"]
+
+
+def emls(job_id):
+    return [
+        (linha["assunto"], linha["eml"])
+        for linha in _db().execute(
+            """SELECT assunto, eml FROM mensagens
+               WHERE job_id = ? AND eml IS NOT NULL ORDER BY ordem""",
+            (job_id,)
+        )
+    ]
+
+
+def finalizar(job_id, resumo=None):
+    # credenciais, corpos e .eml saem do arquivo
+    agora = time.time()
+
+    with _transacao() as db:
+        db.execute(
+            """UPDATE jobs SET contas = NULL, resumo = ?, terminado_em = ?,
+                   status = CASE WHEN erro IS NULL THEN 'concluído' ELSE 'erro' END
+               WHERE id = ?""",
+            (resumo, agora, job_id)
+        )
+        db.execute(
+            "UPDATE mensagens SET item = NULL, eml = NULL WHERE job_id = ?",
+            (job_id,)
+        )
+        db.execute("DELETE FROM anexos WHERE job_id = ?", (job_id,))
+
+        # jobs antigos saem do arquivo (painel não carrega
+        # o histórico inteiro a cada atualização)
+        antigos = """SELECT id FROM jobs
+                     WHERE status IN ('concluído', 'erro') AND terminado_em < ?"""
+        db.execute(
+            f"DELETE FROM mensagens WHERE job_id IN ({antigos})",
+            (agora - GUARDAR_JOBS_S,)
+        )
+        db.execute(
+            f"DELETE FROM jobs WHERE id IN ({antigos})",
+            (agora - GUARDAR_JOBS_S,)
+        )
+
+
+# --------------------------------------------------
+# LEITURA (PAINEL E WORKERS)
+# mesmo formato do job em memória do envio.py
+# --------------------------------------------------
+def carregar_job(job_id):
+    db = _db()
+
+    linha = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if linha is None:
+        return None
+
+    job = {
+        "id": linha["id"],
+        "descricao": linha["descricao"],
+        "usuario": linha["usuario"],
+        "credencial": linha["credencial"],
+        "contas": [tuple(c) for c in json.loads(linha["contas"] or "[]")],
+        "prioridade": linha["prioridade"],
+        "inicio": linha["inicio"],
+        "cc_resumo": json.loads(linha["cc_resumo"]),
+        "anexar_eml": bool(linha["anexar_eml"]),
+        "status": linha["status"],
+        "criado_em": datetime.fromisoformat(linha["criado_em"]),
+        "total": linha["total"],
+        "rejeitadas": json.loads(linha["rejeitadas"]),
+        "sem_email": json.loads(linha["sem_email"]),
+        "avisos": json.loads(linha["avisos"]),
+        "erro": linha["erro"],
+        "resumo": linha["resumo"],
+        "terminado_em": linha["terminado_em"],
+        "enviados": 0,
+        "bytes": 0,
+        "por_conta": {},
+        "log": [],
+        "falhas": [],
+    }
+
+    for m in db.execute(
+        """SELECT situacao, log, remetente, bytes, erro FROM mensagens
+           WHERE job_id = ? AND situacao IN ('enviada', 'falha') ORDER BY ordem""",
+        (job_id,)
+    ):
+        log = json.loads(m["log"]) if m["log"] else {}
+
+        if m["situacao"] == "falha":
+            job["falhas"].append({**log, "Erro": m["erro"]})
+            continue
+
+        job["enviados"] += 1
+        job["bytes"] += m["bytes"]
+        job["por_conta"][m["remetente"]] = job["por_conta"].get(m["remetente"], 0) + 1
+        job["log"].append({**log, "Remetente": m["remetente"], "Bytes": m["bytes"]})
+
+    return job
+
+
+def jobs(ids=(), credencial=None, limite=None):
+    # mais recentes primeiro; só os "limite" primeiros são carregados
+    marcadores = ",".join("?" * len(ids)) or "NULL"
+
+    encontrados = _db().execute(
+        f"""SELECT id FROM jobs WHERE id IN ({marcadores}) OR credencial = ?
+            ORDER BY criado_em DESC LIMIT ?""",
+        (*ids, credencial, -1 if limite is None else limite)
+    ).fetchall()
+
+    return [carregar_job(linha["id"]) for linha in encontrados]
+
+
+def workers_ativos():
+    linha = _db().execute(
+        "SELECT COUNT(*) FROM workers WHERE visto_em > ?",
+        (time.time() - 2 * HEARTBEAT_S,)
+    ).fetchone()
+    return linha[0]
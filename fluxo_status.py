@@ -0,0 +1,134 @@
+import pandas as pd
+
+import esquemas
+from indice import construir_indice, grupos_por_unidade
+from leitura import normalizar_categorias
+
+# --------------------------------------------------
+# FLUXO NORMAL (EXPORTAÇÃO DO TMS POR STATUS)
+# Leitura, índice e montagem das mensagens por unidade,
+# sem nada de interface: o app.py cuida da tela.
+# --------------------------------------------------
+
+# posições no frame lido com esquemas.TMS
+# (A,B,C,D,G,H,J,O,Q,R,S da exportação)
+POS_UNIDADE = 4     # G
+POS_STATUS = 7      # O
+POS_DESCRICAO = 10  # S
+
+
+# --------------------------------------------------
+# LEITURA
+# → unifica todas as planilhas; arquivo fora do layout
+#   gera esquemas.LayoutInvalido antes de juntar
+# --------------------------------------------------
+def ler_exportacoes(arquivos):
+    df = pd.concat(
+        [esquemas.ler(file, esquemas.TMS) for file in arquivos],
+        ignore_index=True
+    )
+
+    normalizar_categorias(
+        df,
+        [df.columns[POS_UNIDADE], df.columns[POS_STATUS], df.columns[POS_DESCRICAO]]
+    )
+
+    # leitura com dtype por coluna deixa um bloco por coluna;
+    # o copy() junta as de texto e o df.iloc por unidade
+    # (grupos_por_unidade) fica bem mais barato
+    return df.copy()
+
+
+def indexar(df):
+    return construir_indice(
+        df,
+        df.columns[POS_STATUS],
+        df.columns[POS_DESCRICAO],
+        df.columns[POS_UNIDADE]
+    )
+
+
+# --------------------------------------------------
+# AGRUPAMENTO
+# filtros = [(status, descricoes ou None)]
+# → [(unidade, [(status, pedidos_unidade), ...])]
+# --------------------------------------------------
+def secoes_por_unidade(df, indice, filtros):
+    secoes = {}
+
+    for status, descricoes in filtros:
+        for unidade, pedidos_unidade in grupos_por_unidade(
+            df, indice, status, descricoes
+        ):
+            secoes.setdefault(unidade, []).append((status, pedidos_unidade))
+
+    return sorted(secoes.items())
+
+
+# --------------------------------------------------
+# RENDERIZAÇÃO
+# --------------------------------------------------
+def tabela_unidade(pedidos_unidade, custodia):
+    # A,B,C,D,G,H,J,O,Q,R (+ S na custódia)
+    qtd = 11 if custodia else 10
+
+    # nomes das colunas já vêm do esquema
+    return pedidos_unidade.iloc[:, :qtd]
+
+
+def corpo_unidade(texto_base, secoes, resumo=False):
+    texto_html = texto_base.replace("\n", "<br>")
+
+    tabelas = []
+    for status, pedidos_unidade in secoes:
+        tabela = tabela_unidade(pedidos_unidade, "CUSTODIA" in status)
+
+        # modo resumo: uma seção por status
+        if resumo:
+            tabelas.append(f"<h3>{status} ({len(pedidos_unidade)})</h3>")
+
+        tabelas.append(tabela.to_html(index=False, border=1))
+
+    tabela_html = "\n".join(tabelas)
+
+    return f"""
+    <p>{texto_html}</p>
+    {tabela_html}
+    <p><strong><u>SE NÃO ESTIVER NA SUA UNIDADE, FAVOR DESCONSIDERAR.</u></strong></p>
+    <p><i>Mensagem automática.</i></p>
+    """
+
+
+def montar_mensagens(grupos, emails_unidades, assunto, texto_base, cc_list, resumo=False,
+                     htmls=None):
+    # htmls: corpos já renderizados na prévia, por unidade
+    mensagens = []
+    sem_email = []
+
+    for unidade, secoes in grupos:
+
+        emails_to = list(emails_unidades.get(unidade, ()))
+
+        if not emails_to:
+            sem_email.append(unidade)
+            continue
+
+        html = htmls.get(unidade) if htmls else None
+        if html is None:
+            html = corpo_unidade(texto_base, secoes, resumo)
+
+        mensagens.append({
+            "para": emails_to,
+            "cc": cc_list,
+            "assunto": f"{assunto} – Unidade {unidade}",
+            "html": html,
+            "log": {
+                "Unidade": unidade,
+                "Status": ", ".join(status for status, _ in secoes),
+                "Qtd registros": sum(len(p) for _, p in secoes),
+                "Para": ", ".join(emails_to),
+                "CC": ", ".join(cc_list)
+            }
+        })
+
+    return mensagens, sem_email
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------
+# ÍNDICE STATUS → DESCRIÇÃO → UNIDADE → POSIÇÕES
+# Montado uma vez por upload. Trocar o status ou a
+# descrição só toca nas linhas selecionadas, sem
+# refiltrar / reagrupar a planilha inteira.
+# --------------------------------------------------
+def construir_indice(df, col_status, col_descricao, col_unidade):
+    cod_status, cat_status = pd.factorize(df[col_status], sort=True)
+    cod_desc, cat_desc = pd.factorize(df[col_descricao], sort=True)
+    cod_unid, cat_unid = pd.factorize(df[col_unidade], sort=True)
+
+    # ordenação estável: dentro de cada grupo as posições
+    # continuam na ordem original da planilha
+    ordem = np.lexsort((cod_unid, cod_desc, cod_status))
+
+    chaves = np.column_stack([cod_status, cod_desc, cod_unid])[ordem]
+    quebras = np.flatnonzero((np.diff(chaves, axis=0) != 0).any(axis=1)) + 1
+
+    indice = {}
+
+    for inicio, posicoes in zip(
+        np.concatenate([[0], quebras]),
+        np.split(ordem, quebras)
+    ):
+        if not len(posicoes):
+            continue
+
+        s, d, u = chaves[inicio]
+
+        # código -1 = valor vazio (NaN)
+        if s < 0 or u < 0:
+            continue
+
+        descricao = cat_desc[d] if d >= 0 else None
+
+        (
+            indice
+            .setdefault(cat_status[s], {})
+            .setdefault(descricao, {})
+        )[cat_unid[u]] = posicoes
+
+    return indice
+
+
+def status_disponiveis(indice):
+    return list(indice)
+
+
+def descricoes_do_status(indice, status):
+    return [d for d in indice.get(status, {}) if d is not None]
+
+
+def grupos_por_unidade(df, indice, status, descricoes=None):
+    por_descricao = indice.get(status, {})
+
+    if descricoes is not None:
+        por_descricao = {
+            d: por_descricao[d] for d in descricoes if d in por_descricao
+        }
+
+    posicoes_unidade = {}
+    for por_unidade in por_descricao.values():
+        for unidade, posicoes in por_unidade.items():
+            posicoes_unidade.setdefault(unidade, []).append(posicoes)
+
+    grupos = []
+    for unidade in sorted(posicoes_unidade):
+        blocos = posicoes_unidade[unidade]
+        posicoes = blocos[0] if len(blocos) == 1 else np.sort(np.concatenate(blocos))
+        grupos.append((unidade, df.iloc[posicoes]))
+
+    return grupos
+
+
+def posicoes_do_status(indice, status, descricoes=None):
+    por_descricao = indice.get(status, {})
+
+    blocos = [
+        posicoes
+        for descricao, por_unidade in por_descricao.items()
+        if descricoes is None or descricao in descricoes
+        for posicoes in por_unidade.values()
+    ]
+
+    if not blocos:
+        return np.array([], dtype=np.intp)
+
+    return np.sort(np.concatenate(blocos))
@@ -0,0 +1,232 @@
+import atexit
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --------------------------------------------------
+# ORÇAMENTO DE MEMÓRIA POR SESSÃO
+# Cada operador tem seu próprio espaço em session_state.
+#
+# Na execução de uma sessão, itens que ela não leu nem
+# guardou na execução anterior nem na atual vão para o
+# disco (menos usados primeiro) quando o total passa do
+# limite. Os demais ficam: o app ainda guarda a referência
+# ou vai pedir de novo logo, e despejar só forçaria
+# pickle + leitura a cada rerun.
+# Os arquivos enviados aparecem no uso, mas não contam no
+# limite: não há como despejá-los.
+#
+# Sessão ociosa (aba parada, sem nenhuma execução) vai
+# inteira para o disco no início da execução de qualquer
+# outra sessão; é isso que segura a memória do servidor
+# com muitos operadores. Sessão sumida há mais de
+# VALIDADE_SPILL_S é esquecida e seus arquivos apagados.
+#
+# Os pickles ficam numa pasta privada do processo
+# (tempfile.mkdtemp, só o dono lê), apagada na saída.
+#
+# AUTOMAILER_MEMORIA_MB       limite por sessão (padrão 512)
+# AUTOMAILER_MEMORIA_OCIOSA_S sessão ociosa depois disso (padrão 600)
+# AUTOMAILER_SPILL_DIR        onde criar a pasta privada
+#                             (padrão: temp do sistema)
+# --------------------------------------------------
+LIMITE_MB = float(os.environ.get("AUTOMAILER_MEMORIA_MB", 512))
+OCIOSA_S = float(os.environ.get("AUTOMAILER_MEMORIA_OCIOSA_S", 600))
+
+PAI_SPILL = os.environ.get("AUTOMAILER_SPILL_DIR") or None
+
+VALIDADE_SPILL_S = 24 * 3600
+
+# sessões com itens guardados (todas as abas do processo)
+_SESSOES = {}
+_TRAVA = threading.RLock()
+_PASTA = []
+
+
+def _tamanho(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_tamanho(v) for v in obj.values()) + sys.getsizeof(obj)
+    return sys.getsizeof(obj)
+
+
+def _pasta_spill():
+    if not _PASTA:
+        pasta = tempfile.mkdtemp(prefix="automailer-", dir=PAI_SPILL)
+        atexit.register(shutil.rmtree, pasta, True)
+        _PASTA.append(pasta)
+    return _PASTA[0]
+
+
+def _estado():
+    if "_memoria" not in st.session_state:
+        st.session_state["_memoria"] = {
+            "sessao": uuid.uuid4().hex,
+            "uploads": 0,
+            "em_uso": set(),
+            "em_uso_anterior": set(),
+            "ativa_em": time.monotonic(),
+            "itens": {},  # chave -> {"obj", "bytes", "arquivo", "uso"}
+        }
+    estado = st.session_state["_memoria"]
+
+    with _TRAVA:
+        _SESSOES[estado["sessao"]] = estado
+        estado["ativa_em"] = time.monotonic()
+
+    return estado
+
+
+def _arquivo_spill(estado, chave):
+    pasta = os.path.join(_pasta_spill(), estado["sessao"])
+    os.makedirs(pasta, mode=0o700, exist_ok=True)
+    return os.path.join(pasta, f"{chave}.pkl")
+
+
+def _descartar_spill(item):
+    if item.get("arquivo"):
+        try:
+            os.remove(item["arquivo"])
+        except OSError:
+            pass
+        item["arquivo"] = None
+
+
+def _despejar(estado, chave):
+    item = estado["itens"][chave]
+    item["arquivo"] = _arquivo_spill(estado, chave)
+
+    with open(item["arquivo"], "wb") as f:
+        pickle.dump(item["obj"], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    item["obj"] = None
+
+
+# --------------------------------------------------
+# CONTABILIDADE
+# --------------------------------------------------
+def registrar_uploads(arquivos):
+    # chamado no início de cada execução com arquivos:
+    # a lista de itens em uso passa a ser a da execução anterior
+    estado = _estado()
+    estado["uploads"] = sum(getattr(f, "size", 0) for f in arquivos)
+
+    with _TRAVA:
+        estado["em_uso_anterior"] = estado["em_uso"]
+        estado["em_uso"] = set()
+        _despejar_ociosas(estado)
+
+
+def _em_memoria(estado):
+    return sum(
+        item["bytes"] for item in estado["itens"].values()
+        if item["obj"] is not None
+    )
+
+
+def uso_sessao():
+    estado = _estado()
+    return estado["uploads"] + _em_memoria(estado)
+
+
+def _aplicar_limite(estado):
+    limite = LIMITE_MB * 1024 * 1024
+
+    # menos usados primeiro; itens desta execução e da anterior ficam
+    em_uso = estado["em_uso"] | estado["em_uso_anterior"]
+    candidatos = sorted(
+        (
+            (item["uso"], chave) for chave, item in estado["itens"].items()
+            if item["obj"] is not None and chave not in em_uso
+        )
+    )
+
+    for _, chave in candidatos:
+        if _em_memoria(estado) <= limite:
+            break
+        _despejar(estado, chave)
+
+
+def _despejar_ociosas(atual):
+    agora = time.monotonic()
+
+    for sessao, estado in list(_SESSOES.items()):
+        if estado is atual:
+            continue
+
+        parada = agora - estado["ativa_em"]
+
+        if parada > VALIDADE_SPILL_S:
+            # aba fechada: ninguém vai pedir esses itens
+            del _SESSOES[sessao]
+            estado["itens"] = {}
+            shutil.rmtree(os.path.join(_pasta_spill(), sessao), ignore_errors=True)
+
+        elif parada > OCIOSA_S:
+            for chave, item in estado["itens"].items():
+                if item["obj"] is not None:
+                    _despejar(estado, chave)
+
+
+# --------------------------------------------------
+# ACESSO
+# --------------------------------------------------
+def guardar(chave, obj):
+    estado = _estado()
+
+    with _TRAVA:
+        antigo = estado["itens"].get(chave)
+        if antigo:
+            _descartar_spill(antigo)
+
+        estado["itens"][chave] = {
+            "obj": obj,
+            "bytes": _tamanho(obj),
+            "arquivo": None,
+            "uso": time.monotonic(),
+        }
+
+        estado["em_uso"].add(chave)
+        _aplicar_limite(estado)
+
+
+def obter(chave, padrao=None):
+    estado = _estado()
+
+    # trava: outra sessão pode estar despejando esta
+    # (sessão ociosa) ao mesmo tempo
+    with _TRAVA:
+        item = estado["itens"].get(chave)
+
+        if item is None:
+            return padrao
+
+        if item["obj"] is None:
+            with open(item["arquivo"], "rb") as f:
+                item["obj"] = pickle.load(f)
+            _descartar_spill(item)
+
+        item["uso"] = time.monotonic()
+        estado["em_uso"].add(chave)
+        _aplicar_limite(estado)
+
+        return item["obj"]
+
+
+def mostrar_uso():
+    st.sidebar.caption(
+        f"💾 Memória da sessão: {uso_sessao() / 1024 / 1024:.1f} MB "
+        f"/ {LIMITE_MB:.0f} MB"
+    )
@@ -1,29 +1,17 @@
 import streamlit as st
 import pandas as pd
 import re
-import smtplib
-from email.mime.text import MIMEText
 
-# --------------------------------------------------
-# BASE DE EMAILS DOS RESTAURANTES
-# --------------------------------------------------
-@st.cache_data
-def carregar_emails_restaurantes():
-    df = pd.read_excel("emails_restaurantes.xlsx", header=0)
-    df.columns = ["RESTAURANTE", "EMAILS"]
-
-    df["RESTAURANTE"] = (
-        df["RESTAURANTE"]
-        .astype(str)
-        .str.strip()
-        .str.upper()
-    )
-
-    df["EMAILS"] = df["EMAILS"].astype(str).str.strip()
-
-    return dict(zip(df["RESTAURANTE"], df["EMAILS"]))
-
-emails_restaurantes = carregar_emails_restaurantes()
+from destinatarios import mostrar_problemas_diretorio
+from diretorios import (
+    ARQUIVO_RESTAURANTES,
+    carregar_emails_restaurantes,
+    problemas_diretorio,
+)
+import agenda
+import envio
+import esquemas
+import remetentes
 
 # --------------------------------------------------
 # PARSER DOS TXT
@@ -75,54 +63,96 @@ def parse_txt(arquivo):
         except Exception:
             continue
 
-    return pd.DataFrame(dados, columns=[
-        "RESTAURANTE",
-        "PEDIDO",
-        "DATA",
-        "ITEM",
-        "QTDE",
-        "DESCRICAO",
-        "PRECO_UNIT_RS",
-        "PRECO_UNIT_USD",
-        "RESPONSAVEL",
-        "OBSERVACAO",
-        "OC",
-        "CNPJ",
-        "ARQUIVO_ORIGEM"
-    ])
+    # nenhuma linha no formato esperado: arquivo errado
+    if not dados:
+        raise esquemas.LayoutInvalido(
+            esquemas.PEDIDOS_TXT, arquivo.name, ["nenhuma linha de pedido reconhecida"]
+        )
+
+    return pd.DataFrame(
+        dados, columns=esquemas.nomes(esquemas.PEDIDOS_TXT) + ["ARQUIVO_ORIGEM"]
+    )
 
 # --------------------------------------------------
-# FLUXO PRINCIPAL
+# LEITURA
+# data dd/mm/aaaa e preços 1.234,56 (esquemas.PEDIDOS_TXT)
+# → (df, valores fora do formato)
 # --------------------------------------------------
-def run(arquivos, email_user, senha):
+def ler_pedidos(arquivos):
+    df = pd.concat([parse_txt(arq) for arq in arquivos], ignore_index=True)
+    return df, esquemas.converter(df, esquemas.PEDIDOS_TXT)
 
-    # -----------------------------
-    # VARIÁVEIS DE CONTROLE
-    # -----------------------------
-    log_envio = []
+
+# --------------------------------------------------
+# MENSAGENS (uma por linha de pedido)
+# → (mensagens, restaurantes sem e-mail)
+# --------------------------------------------------
+def montar_mensagens(df, emails_restaurantes, cc_list):
     sem_email = []
+    mensagens = []
 
-    # -----------------------------
-    # UNIFICA TODOS OS TXT
-    # -----------------------------
-    dfs = [parse_txt(arq) for arq in arquivos]
-    df = pd.concat(dfs, ignore_index=True)
+    for _, pedido in df.iterrows():
+
+        restaurante = pedido["RESTAURANTE"]
+        emails_to = list(emails_restaurantes.get(restaurante, ()))
+
+        if not emails_to:
+            sem_email.append(restaurante)
+            continue
+
+        corpo_html = f"""
+        <p>Bom dia!</p>
+        <br>
+        <p><strong>{restaurante}</strong>,</p>
+        <p>
+        Foi transmitido a nós o pedido: 
+        <strong>{pedido['PEDIDO']}</strong> referentes a 
+        <strong>{pedido['DESCRICAO']}</strong>, 
+        solicitado via Central de Pedidos por 
+        <strong>{pedido['RESPONSAVEL']}</strong>.
+        </p>
+        <p>
+        Por gentileza, nos encaminhar a NOTA FISCAL 
+        para agendamento da coleta.
+        </p>
+        <br>
+        <p>Obrigado, no aguardo de um retorno.</p>
+        """
+
+        mensagens.append({
+            "para": emails_to,
+            "cc": list(cc_list),
+            "assunto": f'SOLICITAÇÃO DE NF {pedido["RESTAURANTE"]} {pedido["PEDIDO"]}',
+            "html": corpo_html,
+            "log": {
+                "Restaurante": restaurante,
+                "Pedido": pedido["PEDIDO"],
+                "Para": ", ".join(emails_to)
+            }
+        })
+
+    return mensagens, sem_email
+
+
+# --------------------------------------------------
+# FLUXO PRINCIPAL
+# --------------------------------------------------
+def run(arquivos, email_user, senha):
 
     # -----------------------------
-    # TRATAMENTOS
+    # UNIFICA TODOS OS TXT
     # -----------------------------
-    df["DATA"] = pd.to_datetime(df["DATA"], dayfirst=True, errors="coerce")
-    df["QTDE"] = pd.to_numeric(df["QTDE"], errors="coerce")
-
-    df["PRECO_UNIT_RS"] = (
-        df["PRECO_UNIT_RS"]
-        .astype(str)
-        .str.replace(".", "", regex=False)
-        .str.replace(",", ".", regex=False)
-    )
-    df["PRECO_UNIT_RS"] = pd.to_numeric(
-        df["PRECO_UNIT_RS"], errors="coerce"
-    )
+    try:
+        df, problemas = ler_pedidos(arquivos)
+    except esquemas.LayoutInvalido as e:
+        st.error(f"❌ {e}")
+        st.stop()
+
+    for coluna, qtd, exemplos in problemas:
+        st.warning(
+            f"⚠️ {coluna}: {qtd} valor(es) fora do formato esperado "
+            f"(ex.: {', '.join(map(str, exemplos))})"
+        )
 
     # -----------------------------
     # CONFIGURAÇÃO DO EMAIL
@@ -130,11 +160,18 @@ def run(arquivos, email_user, senha):
     st.markdown("---")
     st.subheader("✉️ Configuração do e-mail")
 
+    mostrar_problemas_diretorio(
+        problemas_diretorio(ARQUIVO_RESTAURANTES), ARQUIVO_RESTAURANTES
+    )
+
     cc_input = st.text_input(
         "CC (separados por vírgula)",
         placeholder="email1@evelog.com.br, email2@evelog.com.br"
     )
 
+    cc_resumo, anexar_eml = envio.opcoes_copia("pedidos")
+    inicio, espalhar_min = agenda.opcoes_agendamento("pedidos")
+
     # -----------------------------
     # ENVIO DOS EMAILS
     # -----------------------------
@@ -144,83 +181,22 @@ def run(arquivos, email_user, senha):
             st.error("Credenciais não informadas no app principal.")
             st.stop()
 
-        total = len(df)
-        enviados = 0
-
-        progress_bar = st.progress(0)
-        contador = st.empty()
-
-        with st.spinner("📨 Enviando e-mails..."):
-
-            with smtplib.SMTP_SSL("email-ssl.com.br", 465) as smtp:
-                smtp.login(email_user, senha)
-
-                for _, pedido in df.iterrows():
-
-                    restaurante = pedido["RESTAURANTE"]
-                    emails_raw = emails_restaurantes.get(restaurante)
-
-                    if not emails_raw:
-                        sem_email.append(restaurante)
-                        continue
-
-                    emails_to = [
-                        e.strip()
-                        for e in emails_raw.split(",")
-                        if e.strip()
-                    ]
-
-                    # CC fixo = remetente
-                    cc_list = [email_user]
-
-                    corpo_html = f"""
-                    <p>Bom dia!</p>
-                    <br>
-                    <p><strong>{restaurante}</strong>,</p>
-                    <p>
-                    Foi transmitido a nós o pedido: 
-                    <strong>{pedido['PEDIDO']}</strong> referentes a 
-                    <strong>{pedido['DESCRICAO']}</strong>, 
-                    solicitado via Central de Pedidos por 
-                    <strong>{pedido['RESPONSAVEL']}</strong>.
-                    </p>
-                    <p>
-                    Por gentileza, nos encaminhar a NOTA FISCAL 
-                    para agendamento da coleta.
-                    </p>
-                    <br>
-                    <p>Obrigado, no aguardo de um retorno.</p>
-                    """
-
-                    msg = MIMEText(corpo_html, "html")
-                    msg["From"] = email_user
-                    msg["To"] = ", ".join(emails_to)
-                    msg["Cc"] = ", ".join(cc_list)
-                    msg["Subject"] = f'SOLICITAÇÃO DE NF {pedido["RESTAURANTE"]} {pedido["PEDIDO"]}'
-
-                    smtp.send_message(
-                        msg,
-                        to_addrs=emails_to + cc_list
-                    )
-
-                    enviados += 1
-                    progress_bar.progress(int((enviados / total) * 100))
-
-                    contador.markdown(
-                        f"📧 E-mails enviados: {enviados} / {total}"
-                    )
-
-                    log_envio.append({
-                        "Restaurante": restaurante,
-                        "Pedido": pedido["PEDIDO"],
-                        "Para": ", ".join(emails_to)
-                    })
-
-        if log_envio:
-            st.success("✅ Envio concluído com sucesso!")
-            st.subheader("📄 Log de envio")
-            st.dataframe(pd.DataFrame(log_envio), hide_index=True)
-
-        if sem_email:
-            st.warning("⚠️ Restaurantes sem e-mail cadastrado:")
-            st.write(list(set(sem_email)))
+        # CC fixo = remetente
+        mensagens, sem_email = montar_mensagens(
+            df, carregar_emails_restaurantes(), [email_user]
+        )
+
+        job_id = envio.enfileirar(
+            descricao="Solicitação de NF (Central de Pedidos)",
+            email_user=email_user,
+            senha=senha,
+            mensagens=mensagens,
+            sem_email=sem_email,
+            contas_extras=remetentes.contas_extras_da_sessao(),
+            cc_resumo=cc_resumo,
+            anexar_eml=anexar_eml,
+            prioridade=agenda.NORMAL,
+            inicio=inicio,
+            espalhar_min=espalhar_min
+        )
+        envio.registrar_job_na_sessao(job_id)
@@ -0,0 +1,281 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from html import escape
+
+import streamlit as st
+
+# --------------------------------------------------
+# PERFILAMENTO SOB DEMANDA
+# Liga pela barra lateral (ou AUTOMAILER_PERFIL=1).
+# Cada trecho embrulhado com perfilar() gera, por
+# execução, na pasta AUTOMAILER_PERFIS (padrão .perfis):
+#   <nome>.prof    estatísticas do cProfile
+#   <nome>.folded  pilhas amostradas (formato flamegraph.pl)
+#   <nome>.svg     flame graph das amostras
+# --------------------------------------------------
+PASTA_PERFIS = os.environ.get("AUTOMAILER_PERFIS", ".perfis")
+INTERVALO_AMOSTRA_S = 0.005
+MAX_PERFIS = 30
+
+
+def ativo():
+    if os.environ.get("AUTOMAILER_PERFIL") == "1":
+        return True
+    return bool(st.session_state.get("perfil_ativo"))
+
+
+# --------------------------------------------------
+# AMOSTRADOR (pilha da thread alvo a cada 5 ms)
+# --------------------------------------------------
+class _Amostrador(threading.Thread):
+
+    def __init__(self, alvo):
+        super().__init__(name="automailer-perfil", daemon=True)
+        self.alvo = alvo
+        self.pilhas = Counter()
+        self.ligado = threading.Event()
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(INTERVALO_AMOSTRA_S):
+            if not self.ligado.is_set():
+                continue
+
+            frame = sys._current_frames().get(self.alvo)
+            if frame is None:
+                continue
+
+            pilha = []
+            while frame is not None:
+                codigo = frame.f_code
+                modulo = os.path.splitext(os.path.basename(codigo.co_filename))[0]
+                pilha.append(f"{modulo}:{codigo.co_name}")
+                frame = frame.f_back
+
+            self.pilhas[";".join(reversed(pilha))] += 1
+
+
+# --------------------------------------------------
+# PERFIL EM TRECHOS
+# um perfil pode somar vários trechos da mesma thread
+# (ex.: as mensagens de um job, intercaladas com outros
+# jobs pelo agendador) e é gravado uma vez no encerrar()
+# --------------------------------------------------
+def novo(nome):
+    amostrador = _Amostrador(threading.get_ident())
+    amostrador.start()
+
+    return {
+        "nome": nome,
+        "cprofile": cProfile.Profile(),
+        "amostrador": amostrador,
+        "duracao": 0.0,
+    }
+
+
+@contextmanager
+def trecho(sessao):
+    if sessao is None:
+        yield
+        return
+
+    sessao["amostrador"].ligado.set()
+    sessao["cprofile"].enable()
+    inicio = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        sessao["cprofile"].disable()
+        sessao["amostrador"].ligado.clear()
+        sessao["duracao"] += time.perf_counter() - inicio
+
+
+def encerrar(sessao):
+    if sessao is None:
+        return
+
+    sessao["amostrador"].parar.set()
+    sessao["amostrador"].join()
+
+    _salvar(
+        sessao["nome"],
+        sessao["cprofile"],
+        sessao["amostrador"].pilhas,
+        sessao["duracao"]
+    )
+
+
+@contextmanager
+def perfilar(nome, ligado=None):
+    if ligado is None:
+        ligado = ativo()
+
+    sessao = novo(nome) if ligado else None
+
+    try:
+        with trecho(sessao):
+            yield
+    finally:
+        encerrar(sessao)
+
+
+def _salvar(nome, perfil, pilhas, duracao):
+    os.makedirs(PASTA_PERFIS, exist_ok=True)
+
+    base = os.path.join(
+        PASTA_PERFIS, f"{datetime.now():%Y%m%d_%H%M%S}_{nome}"
+    )
+
+    perfil.dump_stats(f"{base}.prof")
+
+    with open(f"{base}.folded", "w", encoding="utf-8") as f:
+        for pilha, qtd in pilhas.most_common():
+            f.write(f"{pilha} {qtd}\n")
+
+    with open(f"{base}.svg", "w", encoding="utf-8") as f:
+        f.write(flame_graph(pilhas, f"{nome} · {duracao:.2f}s"))
+
+    # guarda só os perfis mais recentes
+    prof = sorted(p for p in os.listdir(PASTA_PERFIS) if p.endswith(".prof"))
+    for antigo in prof[:-MAX_PERFIS]:
+        for ext in (".prof", ".folded", ".svg"):
+            try:
+                os.remove(os.path.join(PASTA_PERFIS, antigo[:-5] + ext))
+            except OSError:
+                pass
+
+
+# --------------------------------------------------
+# FLAME GRAPH (SVG)
+# --------------------------------------------------
+LARGURA_SVG = 1200
+ALTURA_QUADRO = 16
+
+
+def _cor(nome):
+    h = zlib.crc32(nome.encode())
+    return f"rgb({205 + h % 50},{80 + (h >> 8) % 120},{40 + (h >> 16) % 40})"
+
+
+def flame_graph(pilhas, titulo):
+    # árvore de chamadas: nó = [amostras, {filho: nó}]
+    raiz = [0, {}]
+    for pilha, qtd in pilhas.items():
+        raiz[0] += qtd
+        no = raiz
+        for quadro in pilha.split(";"):
+            no = no[1].setdefault(quadro, [0, {}])
+            no[0] += qtd
+
+    total = raiz[0] or 1
+    retangulos = []
+    profundidade_max = 0
+
+    def desenhar(no, x, profundidade):
+        nonlocal profundidade_max
+        for quadro, filho in sorted(no[1].items()):
+            largura = filho[0] / total * LARGURA_SVG
+            if largura >= 0.5:
+                profundidade_max = max(profundidade_max, profundidade)
+                retangulos.append((quadro, filho[0], x, profundidade, largura))
+                desenhar(filho, x, profundidade + 1)
+            x += largura
+
+    desenhar(raiz, 0, 0)
+
+    altura = (profundidade_max + 2) * ALTURA_QUADRO + 24
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{LARGURA_SVG}" '
+        f'height="{altura}" font-family="monospace" font-size="11">',
+        f'<text x="4" y="14">{escape(titulo)} · {total} amostras</text>',
+    ]
+
+    for quadro, qtd, x, profundidade, largura in retangulos:
+        # raiz embaixo, folhas em cima
+        y = altura - (profundidade + 1) * ALTURA_QUADRO
+        rotulo = escape(quadro)
+        texto = rotulo[: int(largura / 7)] if largura > 21 else ""
+        partes.append(
+            f'<g><title>{rotulo} ({qtd} amostras, {qtd / total:.1%})</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{largura:.1f}" '
+            f'height="{ALTURA_QUADRO - 1}" fill="{_cor(quadro)}"/>'
+            f'<text x="{x + 2:.1f}" y="{y + 11}">{texto}</text></g>'
+        )
+
+    partes.append("</svg>")
+    return "\n".join(partes)
+
+
+# --------------------------------------------------
+# VISUALIZAÇÃO (UI)
+# --------------------------------------------------
+def top_funcoes(caminho_prof, n=25):
+    import pandas as pd
+
+    stats = pstats.Stats(caminho_prof, stream=io.StringIO())
+
+    linhas = []
+    for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in stats.stats.items():
+        linhas.append({
+            "Função": f"{os.path.basename(arquivo)}:{linha}({funcao})",
+            "Chamadas": chamadas,
+            "Próprio (s)": round(proprio, 4),
+            "Acumulado (s)": round(acumulado, 4),
+        })
+
+    return (
+        pd.DataFrame(linhas)
+        .sort_values("Acumulado (s)", ascending=False)
+        .head(n)
+    )
+
+
+def controle():
+    st.sidebar.checkbox(
+        "🔬 Perfilar execuções",
+        key="perfil_ativo",
+        help="Grava cProfile + flame graph de cada fluxo e envio"
+    )
+
+
+def mostrar_perfis():
+    if not ativo() or not os.path.isdir(PASTA_PERFIS):
+        return
+
+    perfis = sorted(
+        (p[:-5] for p in os.listdir(PASTA_PERFIS) if p.endswith(".prof")),
+        reverse=True
+    )
+
+    if not perfis:
+        return
+
+    with st.sidebar.expander("🔬 Perfis de execução"):
+        escolhido = st.selectbox("Execução", perfis, key="perfil_escolhido")
+        base = os.path.join(PASTA_PERFIS, escolhido)
+
+        st.dataframe(top_funcoes(f"{base}.prof"), hide_index=True)
+
+        if os.path.exists(f"{base}.svg"):
+            with open(f"{base}.svg", encoding="utf-8") as f:
+                svg = f.read()
+
+            import streamlit.components.v1 as components
+            components.html(svg, height=400, scrolling=True)
+
+        with open(f"{base}.prof", "rb") as f:
+            st.download_button(
+                "⬇️ Baixar .prof",
+                f.read(),
+                file_name=f"{escolhido}.prof"
+            )
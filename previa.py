@@ -0,0 +1,91 @@
+import math
+
+import streamlit as st
+
+# --------------------------------------------------
+# PRÉVIA DAS MENSAGENS POR UNIDADE
+# Só renderiza a página de unidades que está na tela;
+# cada corpo HTML gerado fica num cache da sessão e é
+# reaproveitado pelo envio. O cache é descartado quando
+# muda qualquer coisa que entra no corpo (contexto).
+# --------------------------------------------------
+POR_PAGINA = 5
+ALTURA_PREVIA = 320
+
+
+def cache_renders(chave, contexto):
+    cache = st.session_state.get(f"_previa_{chave}")
+
+    if cache is None or cache["contexto"] != contexto:
+        cache = {"contexto": contexto, "htmls": {}}
+        st.session_state[f"_previa_{chave}"] = cache
+
+    return cache["htmls"]
+
+
+def renderizar(htmls, unidade, gerar):
+    if unidade not in htmls:
+        htmls[unidade] = gerar(unidade)
+    return htmls[unidade]
+
+
+def _pagina(chave, total_paginas):
+    chave_pagina = f"previa_{chave}_pagina"
+
+    # filtro reduziu as páginas: volta para a última válida
+    if st.session_state.get(chave_pagina, 1) > total_paginas:
+        st.session_state[chave_pagina] = total_paginas
+
+    return st.number_input(
+        "Página",
+        min_value=1,
+        max_value=total_paginas,
+        step=1,
+        key=chave_pagina
+    )
+
+
+def mostrar_previa(chave, unidades, gerar, htmls, destinatarios):
+    st.markdown("---")
+    st.subheader("👁️ Prévia das mensagens")
+
+    if not st.toggle("Mostrar prévia por unidade", key=f"previa_{chave}_ativa"):
+        return
+
+    col_busca, col_pagina, _ = st.columns([1, 1, 2])
+
+    with col_busca:
+        busca = st.text_input(
+            "Buscar unidade",
+            key=f"previa_{chave}_busca"
+        ).strip().upper()
+
+    filtradas = [u for u in unidades if busca in str(u).upper()]
+
+    if not filtradas:
+        st.info("Nenhuma unidade encontrada.")
+        return
+
+    total_paginas = math.ceil(len(filtradas) / POR_PAGINA)
+
+    with col_pagina:
+        pagina = _pagina(chave, total_paginas)
+
+    inicio = (pagina - 1) * POR_PAGINA
+    pagina_unidades = filtradas[inicio:inicio + POR_PAGINA]
+
+    st.caption(
+        f"Unidades {inicio + 1}–{inicio + len(pagina_unidades)} de {len(filtradas)}"
+    )
+
+    for unidade in pagina_unidades:
+        emails = destinatarios.get(unidade, ())
+
+        st.markdown(
+            f"**{unidade}** · Para: "
+            + (", ".join(emails) if emails else "⚠️ sem e-mail cadastrado")
+        )
+
+        # st.html sanitiza: o corpo traz dados da planilha
+        with st.container(height=ALTURA_PREVIA):
+            st.html(renderizar(htmls, unidade, gerar))
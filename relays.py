@@ -0,0 +1,219 @@
+import os
+import smtplib
+import threading
+import time
+
+# --------------------------------------------------
+# SERVIDORES SMTP (PRIMÁRIO / SECUNDÁRIO)
+# com disjuntor (circuit breaker) por servidor:
+#   fechado  → usado normalmente
+#   aberto   → FALHAS_PARA_ABRIR falhas de rede seguidas;
+#              ninguém conecta nele até a sonda em segundo
+#              plano conseguir conversar com o servidor ou
+#              até passar o tempo de espera (aí uma tentativa
+#              real decide: sucesso fecha, falha dobra a espera)
+#
+# AUTOMAILER_SMTP_PRIMARIO    host:porta (padrão email-ssl.com.br:465)
+# AUTOMAILER_SMTP_SECUNDARIO  host:porta (vazio = sem secundário)
+# AUTOMAILER_SMTP_TIMEOUT_S   timeout de conexão / comando
+#
+# Porta 465 = SSL direto; outras portas = STARTTLS.
+# --------------------------------------------------
+TIMEOUT_S = float(os.environ.get("AUTOMAILER_SMTP_TIMEOUT_S", 20))
+
+FALHAS_PARA_ABRIR = 3
+ESPERA_INICIAL_S = 60
+ESPERA_MAXIMA_S = 900
+SONDA_A_CADA_S = 15
+
+
+class RelayIndisponivel(Exception):
+
+    def __init__(self, espera):
+        super().__init__(f"nenhum servidor SMTP disponível (nova tentativa em {espera:.0f}s)")
+        self.espera = espera
+
+
+def _ler_relay(texto):
+    host, _, porta = texto.strip().partition(":")
+    return host, int(porta or 465)
+
+
+RELAYS = [
+    _ler_relay(texto)
+    for texto in (
+        os.environ.get("AUTOMAILER_SMTP_PRIMARIO", "email-ssl.com.br:465"),
+        os.environ.get("AUTOMAILER_SMTP_SECUNDARIO", ""),
+    )
+    if texto.strip()
+]
+
+# (host, porta) -> {"falhas", "aberto_ate", "espera", "ultimo_erro"}
+_saude = {
+    relay: {"falhas": 0, "aberto_ate": 0.0, "espera": ESPERA_INICIAL_S, "ultimo_erro": None}
+    for relay in RELAYS
+}
+_lock = threading.Lock()
+_sonda = None
+
+
+# --------------------------------------------------
+# CLASSIFICAÇÃO DE ERROS
+# --------------------------------------------------
+def eh_falha_de_rede(erro):
+    # SMTPException herda de OSError: só desconexão / conexão
+    # recusada contam contra o servidor; respostas SMTP
+    # (senha, destinatário, limite) são da conta / mensagem
+    if isinstance(erro, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(erro, OSError) and not isinstance(erro, smtplib.SMTPException)
+
+
+# --------------------------------------------------
+# SAÚDE / DISJUNTOR
+# --------------------------------------------------
+def _aberto(relay, agora):
+    estado = _saude[relay]
+    return estado["falhas"] >= FALHAS_PARA_ABRIR and estado["aberto_ate"] > agora
+
+
+def registrar_falha(relay, erro):
+    if relay not in _saude:
+        return
+
+    with _lock:
+        estado = _saude[relay]
+        estado["falhas"] += 1
+        estado["ultimo_erro"] = str(erro)
+
+        if estado["falhas"] >= FALHAS_PARA_ABRIR:
+            # tentativa após a espera falhou: espera dobra
+            if estado["aberto_ate"]:
+                estado["espera"] = min(estado["espera"] * 2, ESPERA_MAXIMA_S)
+            estado["aberto_ate"] = time.monotonic() + estado["espera"]
+            abriu = True
+        else:
+            abriu = False
+
+    if abriu:
+        _garantir_sonda()
+
+
+def registrar_sucesso(relay):
+    with _lock:
+        _saude[relay].update(
+            falhas=0, aberto_ate=0.0, espera=ESPERA_INICIAL_S, ultimo_erro=None
+        )
+
+
+def espera_liberacao():
+    agora = time.monotonic()
+    with _lock:
+        esperas = [max(e["aberto_ate"] - agora, 0) for e in _saude.values()]
+    return max(min(esperas, default=ESPERA_INICIAL_S), 5)
+
+
+def situacao():
+    agora = time.monotonic()
+    with _lock:
+        return [
+            {
+                "servidor": f"{host}:{porta}",
+                "estado": "aberto" if _aberto((host, porta), agora) else "ok",
+                "falhas": estado["falhas"],
+                "ultimo_erro": estado["ultimo_erro"],
+            }
+            for (host, porta), estado in _saude.items()
+        ]
+
+
+# --------------------------------------------------
+# CONEXÃO
+# --------------------------------------------------
+def _abrir(relay):
+    host, porta = relay
+
+    if porta == 465:
+        smtp = smtplib.SMTP_SSL(host, porta, timeout=TIMEOUT_S)
+    else:
+        smtp = smtplib.SMTP(host, porta, timeout=TIMEOUT_S)
+        smtp.starttls()
+
+    # servidor de origem fica na conexão para o envio
+    # poder atribuir falhas a ele
+    smtp.relay = relay
+    return smtp
+
+
+def conectar(usuario, senha):
+    agora = time.monotonic()
+
+    with _lock:
+        candidatos = [relay for relay in RELAYS if not _aberto(relay, agora)]
+
+    for relay in candidatos:
+        try:
+            smtp = _abrir(relay)
+        except Exception as e:
+            if not eh_falha_de_rede(e):
+                raise
+            registrar_falha(relay, e)
+            continue
+
+        try:
+            smtp.login(usuario, senha)
+        except Exception as e:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+            if not eh_falha_de_rede(e):
+                raise
+            registrar_falha(relay, e)
+            continue
+
+        registrar_sucesso(relay)
+        return smtp
+
+    raise RelayIndisponivel(espera_liberacao())
+
+
+# --------------------------------------------------
+# SONDA EM SEGUNDO PLANO
+# conversa com os servidores abertos (EHLO / NOOP, sem
+# login) e fecha o disjuntor assim que respondem
+# --------------------------------------------------
+def _sondar():
+    while True:
+        time.sleep(SONDA_A_CADA_S)
+
+        agora = time.monotonic()
+        with _lock:
+            abertos = [relay for relay in RELAYS if _aberto(relay, agora)]
+
+        if not abertos:
+            continue
+
+        for relay in abertos:
+            try:
+                smtp = _abrir(relay)
+                smtp.noop()
+                smtp.quit()
+            except Exception:
+                continue
+
+            registrar_sucesso(relay)
+
+
+def _garantir_sonda():
+    global _sonda
+
+    with _lock:
+        if _sonda is None or not _sonda.is_alive():
+            _sonda = threading.Thread(
+                target=_sondar,
+                name="automailer-sonda-smtp",
+                daemon=True
+            )
+            _sonda.start()
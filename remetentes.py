@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+import zlib
+from collections import deque
+
+import streamlit as st
+
+# --------------------------------------------------
+# POOL DE CONTAS REMETENTES
+# As mensagens são distribuídas entre várias contas
+# para somar a cota de envio do provedor:
+#   - cada unidade (conjunto de destinatários) cai
+#     sempre na mesma conta → conversa coerente
+#   - uso por conta contado na última hora
+#   - conta limitada pelo provedor (ou acima da cota
+#     configurada) fica bloqueada e a mensagem vai
+#     para a próxima conta do anel
+#
+# Com a fila compartilhada o uso vem da tabela de mensagens
+# (todos os workers), não da contagem deste processo.
+#
+# AUTOMAILER_LIMITE_POR_HORA  cota por conta (0 = sem limite)
+# AUTOMAILER_BLOQUEIO_S       tempo de bloqueio após limite
+# --------------------------------------------------
+LIMITE_POR_HORA = int(os.environ.get("AUTOMAILER_LIMITE_POR_HORA", 0))
+BLOQUEIO_S = int(os.environ.get("AUTOMAILER_BLOQUEIO_S", 900))
+
+MAX_CONTAS_EXTRAS = 10
+
+# respostas SMTP de "tente mais tarde" / limite de envio
+CODIGOS_LIMITE = {421, 450, 451, 452, 454}
+TEXTOS_LIMITE = ("limit", "quota", "too many", "rate", "exceeded")
+
+_uso = {}        # usuario -> deque de horários de envio
+_bloqueio = {}   # usuario -> monotonic até quando está bloqueada
+_lock = threading.Lock()
+
+
+# --------------------------------------------------
+# COTA E BLOQUEIO
+# --------------------------------------------------
+def eh_limite(erro):
+    codigo = getattr(erro, "smtp_code", None)
+    texto = str(getattr(erro, "smtp_error", erro)).lower()
+
+    if codigo in CODIGOS_LIMITE:
+        return True
+    return codigo is not None and any(t in texto for t in TEXTOS_LIMITE)
+
+
+def _limpar_uso(envios, agora):
+    while envios and agora - envios[0] > 3600:
+        envios.popleft()
+
+
+def uso_ultima_hora(usuario):
+    with _lock:
+        envios = _uso.setdefault(usuario, deque())
+        _limpar_uso(envios, time.monotonic())
+        return len(envios)
+
+
+def registrar_envio(usuario):
+    with _lock:
+        _uso.setdefault(usuario, deque()).append(time.monotonic())
+
+
+def bloquear(usuario, segundos=BLOQUEIO_S):
+    with _lock:
+        _bloqueio[usuario] = time.monotonic() + segundos
+
+
+def disponivel(usuario, uso=None):
+    # uso = {usuario: envios na última hora} da fila compartilhada
+    with _lock:
+        if _bloqueio.get(usuario, 0) > time.monotonic():
+            return False
+
+    if not LIMITE_POR_HORA:
+        return True
+
+    usados = uso.get(usuario, 0) if uso is not None else uso_ultima_hora(usuario)
+    return usados < LIMITE_POR_HORA
+
+
+def espera_liberacao(contas):
+    # segundos até alguma conta voltar a ter cota
+    agora = time.monotonic()
+    esperas = []
+
+    with _lock:
+        for usuario, _ in contas:
+            espera = max(_bloqueio.get(usuario, 0) - agora, 0)
+
+            envios = _uso.get(usuario)
+            if LIMITE_POR_HORA and envios and len(envios) >= LIMITE_POR_HORA:
+                espera = max(espera, envios[0] + 3600 - agora)
+
+            esperas.append(espera)
+
+    return min(esperas) if esperas else 0
+
+
+# --------------------------------------------------
+# DISTRIBUIÇÃO
+# --------------------------------------------------
+def chave_mensagem(item):
+    return ",".join(sorted(e.lower() for e in item["para"]))
+
+
+def escolher_conta(contas, item, uso=None):
+    # conta "dona" da unidade e, se ela estiver sem cota,
+    # as seguintes do anel
+    inicio = zlib.crc32(chave_mensagem(item).encode()) % len(contas)
+
+    for i in range(len(contas)):
+        conta = contas[(inicio + i) % len(contas)]
+        if disponivel(conta[0], uso):
+            return conta
+
+    return None
+
+
+# --------------------------------------------------
+# FORMULÁRIO (UI)
+# --------------------------------------------------
+def formulario_contas():
+    qtd = st.number_input(
+        "Quantidade de contas adicionais",
+        min_value=0,
+        max_value=MAX_CONTAS_EXTRAS,
+        step=1,
+        key="contas_qtd"
+    )
+
+    for i in range(int(qtd)):
+        col_email, col_senha = st.columns(2)
+
+        with col_email:
+            st.text_input(f"E-mail {i + 2}", key=f"conta_email_{i}")
+
+        with col_senha:
+            st.text_input(f"Senha {i + 2}", type="password", key=f"conta_senha_{i}")
+
+    if LIMITE_POR_HORA:
+        st.caption(f"Cota por conta: {LIMITE_POR_HORA} e-mails/hora")
+
+
+def contas_extras_da_sessao():
+    contas = []
+
+    for i in range(int(st.session_state.get("contas_qtd", 0))):
+        usuario = (st.session_state.get(f"conta_email_{i}") or "").strip()
+        senha = st.session_state.get(f"conta_senha_{i}")
+
+        if usuario and senha:
+            contas.append((usuario, senha))
+
+    return contas
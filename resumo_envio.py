@@ -0,0 +1,111 @@
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+
+# --------------------------------------------------
+# CC EM MODO RESUMO
+# Em vez de copiar o CC em cada mensagem, o job manda
+# uma única mensagem no fim, com unidades, quantidades,
+# falhas e unidades sem e-mail. Opcionalmente anexa um
+# .zip com o .eml de cada mensagem enviada (até o limite
+# AUTOMAILER_LIMITE_EML_MB, padrão 20 MB).
+# --------------------------------------------------
+LIMITE_PACOTE_MB = float(os.environ.get("AUTOMAILER_LIMITE_EML_MB", 20))
+
+
+# --------------------------------------------------
+# PACOTE .EML
+# --------------------------------------------------
+def novo_pacote():
+    buffer = io.BytesIO()
+    return {
+        "buffer": buffer,
+        "zip": zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED),
+        "qtd": 0,
+        "estourou": False,
+    }
+
+
+def adicionar_eml(pacote, msg, assunto):
+    # msg = mensagem montada ou os bytes já gravados na fila
+    if pacote is None or pacote["estourou"]:
+        return
+
+    if pacote["buffer"].tell() > LIMITE_PACOTE_MB * 1024 * 1024:
+        pacote["estourou"] = True
+        return
+
+    pacote["qtd"] += 1
+    nome = re.sub(r"[^\w\- ]+", "_", assunto)[:80].strip()
+    conteudo = msg if isinstance(msg, bytes) else msg.as_bytes()
+    pacote["zip"].writestr(f"{pacote['qtd']:04d} {nome}.eml", conteudo)
+
+
+def fechar_pacote(pacote):
+    if pacote is None or not pacote["qtd"] or pacote["estourou"]:
+        return None
+
+    pacote["zip"].close()
+    return pacote["buffer"].getvalue()
+
+
+# --------------------------------------------------
+# MENSAGEM DE RESUMO
+# --------------------------------------------------
+def _tabela(titulo, linhas):
+    if not linhas:
+        return ""
+
+    # pandas só no fim do job: o import fica fora da
+    # inicialização do app (envio → resumo_envio)
+    import pandas as pd
+
+    return f"<h3>{titulo} ({len(linhas)})</h3>" + pd.DataFrame(linhas).to_html(
+        index=False, border=1
+    )
+
+
+def corpo_resumo(job, pacote):
+    enviados = [
+        {k: v for k, v in linha.items() if k not in ("CC", "Bytes")}
+        for linha in job["log"]
+    ]
+
+    sem_email = sorted(set(map(str, job["sem_email"])))
+
+    avisos = [job["erro"]] if job.get("erro") else []
+    if pacote is not None and pacote["estourou"]:
+        avisos.append(
+            f"Mensagens .eml não anexadas: pacote acima de {LIMITE_PACOTE_MB:g} MB."
+        )
+
+    return f"""
+    <p><strong>{job['descricao']}</strong></p>
+    <p>
+    Enviados: {job['enviados']} de {job['total']}<br>
+    Falhas: {len(job['falhas'])}<br>
+    Rejeitadas (destinatário inválido): {len(job['rejeitadas'])}<br>
+    Sem e-mail cadastrado: {len(sem_email)}<br>
+    Concluído em: {datetime.now():%d/%m/%Y %H:%M}
+    </p>
+    {"".join(f"<p><i>{a}</i></p>" for a in avisos)}
+    {_tabela("Falhas", job["falhas"])}
+    {_tabela("Rejeitadas", job["rejeitadas"])}
+    {_tabela("Sem e-mail cadastrado", [{"Unidade": u} for u in sem_email])}
+    {_tabela("Enviados", enviados)}
+    <p><i>Mensagem automática.</i></p>
+    """
+
+
+def mensagem_resumo(job, pacote=None):
+    anexo = fechar_pacote(pacote)
+
+    return {
+        "para": list(job["cc_resumo"]),
+        "cc": [],
+        "assunto": f"Resumo do envio – {job['descricao']}",
+        "html": corpo_resumo(job, pacote),
+        "anexos": [("mensagens.zip", anexo)] if anexo else [],
+    }
@@ -0,0 +1,394 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import agenda
+import delta
+import envio
+import esquemas
+import fila
+from diretorios import carregar_emails_restaurantes, carregar_emails_unidades
+from leitura import detectar_fluxo, normalizar_categorias
+
+# --------------------------------------------------
+# PASTA VIGIADA (PROCESSAMENTO AUTOMÁTICO)
+#   AUTOMAILER_VIGIA_PASTA=/mnt/tms AUTOMAILER_VIGIA_SENHA=... python vigia.py
+#
+# O TMS e a Central de Pedidos gravam os arquivos numa
+# pasta; a cada AUTOMAILER_VIGIA_INTERVALO_S (padrão 5 s)
+# a pasta é lida e cada arquivo novo ou alterado (sha256)
+# passa pela mesma detecção de fluxo do app e vira job de
+# envio conforme as regras. Arquivo ainda sendo gravado
+# (tamanho / data mudando) espera a próxima passada.
+#
+# Com AUTOMAILER_FILA os jobs vão para a fila compartilhada
+# e aparecem no painel do app; sem ela, o worker em thread
+# deste processo envia.
+#
+# Regras (AUTOMAILER_VIGIA_REGRAS, padrão vigia.json):
+#   {
+#     "remetente": "atendimento@evelog.com.br",
+#     "fluxos": {
+#       "status": {
+#         "status": ["EM ROTA", "CUSTODIA"],
+#         "assunto": "Pendências", "corpo": "Segue...",
+#         "cc": ["gestao@evelog.com.br"], "cc_resumo": true,
+#         "somente_alteradas": true, "espalhar_min": 30
+#       },
+#       "pedidos": {"cc": []},
+#       "arcos": {"cc": ["malote@evelog.com.br"]}
+#     }
+#   }
+# Fluxo sem regra (e a coleta, que depende dos PDFs) é
+# só registrado. A senha vem de AUTOMAILER_VIGIA_SENHA.
+# --------------------------------------------------
+PASTA = os.environ.get("AUTOMAILER_VIGIA_PASTA", "")
+ARQUIVO_REGRAS = os.environ.get("AUTOMAILER_VIGIA_REGRAS", "vigia.json")
+ARQUIVO_ESTADO = os.environ.get("AUTOMAILER_VIGIA_ESTADO", ".vigia_estado.json")
+INTERVALO_S = float(os.environ.get("AUTOMAILER_VIGIA_INTERVALO_S", 5))
+
+EXTENSOES = (".xlsx", ".xls", ".csv", ".txt")
+
+
+class Arquivo(io.BytesIO):
+    # mesma interface do st.file_uploader
+
+    def __init__(self, conteudo, caminho, sha256, assinatura):
+        super().__init__(conteudo)
+        self.name = os.path.basename(caminho)
+        self.size = len(conteudo)
+        self.file_id = sha256
+        self.caminho = caminho
+        # (tamanho, mtime) na listagem
+        self.assinatura = assinatura
+
+
+def _log(texto):
+    print(f"[{datetime.now():%d/%m %H:%M:%S}] {texto}", flush=True)
+
+
+# --------------------------------------------------
+# ESTADO (ARQUIVOS JÁ PROCESSADOS)
+# caminho → {sha256, tamanho, mtime, fluxo, jobs, erro}
+# --------------------------------------------------
+def _carregar_estado():
+    if not os.path.exists(ARQUIVO_ESTADO):
+        return {}
+
+    with open(ARQUIVO_ESTADO, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _salvar_estado(estado):
+    temporario = ARQUIVO_ESTADO + ".tmp"
+
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=1)
+
+    os.replace(temporario, ARQUIVO_ESTADO)
+
+
+# --------------------------------------------------
+# VARREDURA
+# --------------------------------------------------
+def _listar(pasta):
+    # → {caminho: (tamanho, mtime)}
+    arquivos = {}
+
+    for entrada in os.scandir(pasta):
+        nome = entrada.name
+
+        # temporários do Excel / arquivos ocultos
+        if nome.startswith(("~$", ".")) or not nome.lower().endswith(EXTENSOES):
+            continue
+
+        if entrada.is_file():
+            info = entrada.stat()
+            arquivos[entrada.path] = (info.st_size, info.st_mtime)
+
+    return arquivos
+
+
+def novos(pasta, estado, anteriores):
+    # → ([Arquivo], listagem atual); só arquivos parados
+    # desde a passada anterior e com conteúdo novo
+    atuais = _listar(pasta)
+    prontos = []
+
+    for caminho, (tamanho, mtime) in atuais.items():
+        if anteriores.get(caminho) != (tamanho, mtime):
+            continue
+
+        registro = estado.get(caminho)
+        if registro and (registro["tamanho"], registro["mtime"]) == (tamanho, mtime):
+            continue
+
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        sha256 = hashlib.sha256(conteudo).hexdigest()
+
+        # só a data mudou (cópia / touch): nada a fazer
+        if registro and registro["sha256"] == sha256:
+            registro.update(tamanho=tamanho, mtime=mtime)
+            continue
+
+        prontos.append(Arquivo(conteudo, caminho, sha256, (tamanho, mtime)))
+
+    return prontos, atuais
+
+
+# --------------------------------------------------
+# FLUXOS
+# cada um → lista de job ids
+# --------------------------------------------------
+def _cc(regra, conta):
+    # mesma regra do app: remetente sempre em CC
+    cc_list = list(regra.get("cc", []))
+    if conta[0] not in cc_list:
+        cc_list.append(conta[0])
+    return cc_list
+
+
+def _enfileirar(regra, conta, descricao, mensagens, sem_email, prioridade, pausa=0,
+                antes_de_enviar=None):
+    return envio.enfileirar(
+        descricao=f"{descricao} (pasta vigiada)",
+        email_user=conta[0],
+        senha=conta[1],
+        mensagens=mensagens,
+        sem_email=sem_email,
+        pausa=pausa,
+        cc_resumo=regra.get("cc_resumo", False),
+        anexar_eml=regra.get("anexar_eml", False),
+        prioridade=prioridade,
+        espalhar_min=regra.get("espalhar_min", 0),
+        antes_de_enviar=antes_de_enviar
+    )
+
+
+def _status(arquivos, regra, conta):
+    import fluxo_status
+    from indice import posicoes_do_status, status_disponiveis
+
+    df = fluxo_status.ler_exportacoes(arquivos)
+    indice = fluxo_status.indexar(df)
+
+    disponiveis = status_disponiveis(indice)
+    filtros = [(status, None) for status in regra["status"] if status in disponiveis]
+
+    if not filtros:
+        _log("nenhum status da regra nos arquivos")
+        return []
+
+    grupos = fluxo_status.secoes_por_unidade(df, indice, filtros)
+    col_unidade = df.columns[fluxo_status.POS_UNIDADE]
+    linhas_por_status = {
+        status: df.iloc[posicoes_do_status(indice, status)] for status, _ in filtros
+    }
+
+    # só unidades com alterações desde o último envio
+    if regra.get("somente_alteradas", True):
+        alteradas = set()
+        for status, linhas in linhas_por_status.items():
+            alteradas |= delta.unidades_alteradas(status, linhas, col_unidade)[0]
+
+        grupos = [(unidade, secoes) for unidade, secoes in grupos if unidade in alteradas]
+
+    if not grupos:
+        _log("nenhuma unidade com alterações desde o último envio")
+        return []
+
+    mensagens, sem_email = fluxo_status.montar_mensagens(
+        grupos,
+        carregar_emails_unidades(),
+        regra["assunto"],
+        regra["corpo"],
+        _cc(regra, conta),
+        # vários status: um e-mail por unidade com uma seção por status
+        resumo=regra.get("resumo", len(filtros) > 1)
+    )
+
+    return [_enfileirar(
+        regra, conta,
+        f"{regra['assunto']} ({', '.join(status for status, _ in filtros)})",
+        mensagens, sem_email, agenda.MASSA, pausa=2,
+        # foto do delta só das unidades entregues (envio.confirmar_entrega)
+        antes_de_enviar=lambda job_id: delta.registrar_pendente(
+            job_id, linhas_por_status, col_unidade
+        )
+    )]
+
+
+def _pedidos(arquivos, regra, conta):
+    import pedidos_txt
+
+    df, problemas = pedidos_txt.ler_pedidos(arquivos)
+
+    for coluna, qtd, exemplos in problemas:
+        _log(f"{coluna}: {qtd} valor(es) fora do formato esperado (ex.: {exemplos})")
+
+    mensagens, sem_email = pedidos_txt.montar_mensagens(
+        df, carregar_emails_restaurantes(), _cc(regra, conta)
+    )
+
+    return [_enfileirar(
+        regra, conta, "Solicitação de NF (Central de Pedidos)",
+        mensagens, sem_email, agenda.NORMAL
+    )]
+
+
+def _arcos(arquivos, regra, conta):
+    import coletasArcos
+
+    # o app usa uma planilha RE por vez: um job por arquivo
+    jobs = []
+    for arquivo in arquivos:
+        df = esquemas.ler(arquivo, esquemas.ARCOS)
+        normalizar_categorias(df, ["UNIDADE"])
+
+        mensagens, sem_email = coletasArcos.montar_mensagens(
+            df, carregar_emails_unidades(), _cc(regra, conta)
+        )
+
+        jobs.append(_enfileirar(
+            regra, conta, f"Coleta malote Arcos – {arquivo.name}",
+            mensagens, sem_email, agenda.URGENTE
+        ))
+
+    return jobs
+
+
+FLUXOS = {
+    "status": _status,
+    "pedidos": _pedidos,
+    "arcos": _arcos,
+}
+
+
+# --------------------------------------------------
+# PROCESSAMENTO DE UMA PASSADA
+# --------------------------------------------------
+def processar(arquivos, regras, conta, estado):
+    # → job ids criados
+    por_fluxo = {}
+    criados = []
+
+    for arquivo in arquivos:
+        try:
+            fluxo = detectar_fluxo([arquivo])
+        except Exception as e:
+            _registrar(estado, [arquivo], None, [], f"não foi possível ler: {e}")
+            continue
+
+        por_fluxo.setdefault(fluxo, []).append(arquivo)
+
+    for fluxo, lista in por_fluxo.items():
+        nomes = ", ".join(arquivo.name for arquivo in lista)
+        regra = regras.get("fluxos", {}).get(fluxo)
+
+        if fluxo not in FLUXOS or regra is None:
+            _log(f"{nomes}: fluxo {fluxo} sem regra, ignorado")
+            _registrar(estado, lista, fluxo, [], None)
+            continue
+
+        try:
+            jobs = FLUXOS[fluxo](lista, regra, conta)
+        except Exception as e:
+            # layout errado etc.: registra e só volta a tentar
+            # se o arquivo mudar
+            _log(f"{nomes}: erro no fluxo {fluxo}: {e}")
+            _registrar(estado, lista, fluxo, [], str(e))
+            continue
+
+        _log(f"{nomes}: fluxo {fluxo} → job(s) {', '.join(jobs) or 'nenhum'}")
+        _registrar(estado, lista, fluxo, jobs, None)
+        criados.extend(jobs)
+
+    return criados
+
+
+def _registrar(estado, arquivos, fluxo, jobs, erro):
+    for arquivo in arquivos:
+        tamanho, mtime = arquivo.assinatura
+        estado[arquivo.caminho] = {
+            "sha256": arquivo.file_id,
+            "tamanho": tamanho,
+            "mtime": mtime,
+            "fluxo": fluxo,
+            "jobs": jobs,
+            "erro": erro,
+            "processado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+
+
+def _carregar_regras():
+    with open(ARQUIVO_REGRAS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def vigiar(uma_vez=False, ignorar_existentes=False):
+    regras = _carregar_regras()
+    conta = (regras["remetente"], os.environ.get("AUTOMAILER_VIGIA_SENHA", ""))
+
+    estado = _carregar_estado()
+
+    # linha de base: o que já está na pasta não é enviado
+    if ignorar_existentes:
+        prontos, _ = novos(PASTA, estado, _listar(PASTA))
+        _registrar(estado, prontos, None, [], "existente ao iniciar")
+        _salvar_estado(estado)
+        _log(f"{len(prontos)} arquivo(s) existente(s) marcados como processados")
+
+    # arquivo só é lido depois de uma passada parado
+    # (exportação ainda sendo gravada fica para a próxima)
+    anteriores = _listar(PASTA)
+    criados = []
+    _log(f"vigiando {PASTA} a cada {INTERVALO_S:g}s")
+
+    while True:
+        time.sleep(INTERVALO_S)
+
+        prontos, anteriores = novos(PASTA, estado, anteriores)
+
+        if prontos:
+            criados.extend(processar(prontos, regras, conta, estado))
+            _salvar_estado(estado)
+
+        if uma_vez:
+            return criados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uma-vez", action="store_true")
+    parser.add_argument("--ignorar-existentes", action="store_true")
+    args = parser.parse_args()
+
+    if not PASTA or not os.path.isdir(PASTA):
+        sys.exit("Defina AUTOMAILER_VIGIA_PASTA com uma pasta existente.")
+
+    if not os.environ.get("AUTOMAILER_VIGIA_SENHA"):
+        sys.exit("Defina AUTOMAILER_VIGIA_SENHA com a senha do remetente.")
+
+    if fila.ativa() and not envio.SEGREDO:
+        sys.exit("Defina AUTOMAILER_SEGREDO com a mesma chave dos workers.")
+
+    criados = vigiar(args.uma_vez, args.ignorar_existentes)
+
+    # sem fila compartilhada quem envia é a thread deste
+    # processo: espera os jobs terminarem antes de sair
+    if not fila.ativa():
+        while any(
+            envio.obter_job(job_id)["status"] not in ("concluído", "erro")
+            for job_id in criados
+        ):
+            time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import argparse
+import hmac
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+import agenda
+import envio
+import fila
+import relays
+import resumo_envio
+
+# --------------------------------------------------
+# WORKERS DE ENVIO (FILA COMPARTILHADA)
+#   AUTOMAILER_FILA=/caminho/fila.db AUTOMAILER_SEGREDO=... \
+#   AUTOMAILER_CREDENCIAIS=/caminho/contas.json python worker.py --processos 4
+#
+# Cada processo aluga uma mensagem por vez da fila (raia
+# mais prioritária primeiro), envia pelo mesmo caminho do
+# worker em thread (envio.enviar_item) e grava o resultado.
+# Conexões SMTP ficam abertas por job enquanto o processo
+# estiver enviando mensagens dele.
+#
+# Cota por hora das contas: contada na fila (fila.reivindicar
+# reserva a conta), valendo para todos os processos.
+# Bloqueio por limite do provedor (remetentes.py) e
+# disjuntor dos servidores (relays.py) valem por processo.
+#
+# Senhas: a fila só tem usuário + hash de cada conta. A
+# senha vem de AUTOMAILER_CREDENCIAIS (JSON {"usuario":
+# "senha"}, lido só pelos workers) e precisa bater com o
+# hash do job, ou seja, quem enfileira conhece a senha.
+# O hash é HMAC com AUTOMAILER_SEGREDO (mesmo valor no app):
+# sem a chave, o arquivo da fila não serve para testar senhas.
+# --------------------------------------------------
+ESPERA_VAZIA_S = 1
+RECOLOCAR_A_CADA_S = 30
+
+CREDENCIAIS = os.environ.get("AUTOMAILER_CREDENCIAIS", "")
+
+
+def _batimentos(nome):
+    while True:
+        try:
+            fila.heartbeat(nome)
+        except Exception as e:
+            print(f"[{nome}] heartbeat falhou: {e}", file=sys.stderr)
+        time.sleep(fila.HEARTBEAT_S)
+
+
+def _raias_liberadas():
+    # raia MASSA fora da janela não é alugada
+    agora = time.time()
+    return [
+        prioridade for prioridade in agenda.NOMES_RAIAS
+        if agenda.dentro_da_janela(prioridade, agora) == agora
+    ]
+
+
+def _resolver_senhas(job):
+    # relido a cada job: conta nova não exige reiniciar o worker
+    with open(CREDENCIAIS, encoding="utf-8") as f:
+        senhas = json.load(f)
+
+    contas = []
+    for usuario, credencial in job["contas"]:
+        senha = senhas.get(usuario)
+
+        if senha is None:
+            job["avisos"].append(f"{usuario}: conta sem senha em AUTOMAILER_CREDENCIAIS")
+        elif not hmac.compare_digest(envio.hash_credencial(usuario, senha), credencial):
+            job["avisos"].append(f"{usuario}: senha do job difere da configurada no worker")
+        else:
+            contas.append((usuario, senha))
+
+    job["contas"] = contas
+
+
+def _iniciar(job):
+    # → execução do job ou None (erro já em job["erro"])
+    _resolver_senhas(job)
+
+    if not job["contas"]:
+        job["erro"] = "Nenhuma conta do job com senha válida na configuração do worker"
+        return None
+
+    return envio.iniciar_execucao(job)
+
+
+def _avisar_novos(job_id, avisos, antes=0):
+    for aviso in avisos[antes:]:
+        fila.avisar(job_id, aviso)
+
+
+# --------------------------------------------------
+# UMA MENSAGEM
+# --------------------------------------------------
+def _processar(mensagem, execucoes, aguardando):
+    job_id = mensagem["job_id"]
+    execucao = execucoes.get(job_id)
+
+    try:
+        if execucao is None:
+            job = fila.carregar_job(job_id)
+            antes = len(job["avisos"])
+
+            execucao = _iniciar(job)
+            _avisar_novos(job_id, job["avisos"], antes)
+
+            if execucao is None:
+                # nenhuma conta autentica: job inteiro falha
+                fila.abortar(job_id, job["erro"])
+                return
+
+            execucoes[job_id] = execucao
+
+        execucao["usada_em"] = time.monotonic()
+
+        avisos = []
+        resultado = envio.enviar_item(
+            execucao, mensagem["item"], avisos, mensagem["tentativas"],
+            reservada=mensagem["remetente"]
+        )
+        _avisar_novos(job_id, avisos)
+        aguardando.pop(job_id, None)
+
+        if resultado["situacao"] in ("aguardar", "repetir"):
+            fila.adiar(
+                mensagem["id"],
+                time.time() + resultado["espera"],
+                tentativas=resultado["tentativa"]
+            )
+            return
+
+        # .eml só é guardado se o resumo vai levar o pacote
+        eml = None
+        if resultado["situacao"] == "enviada" and execucao["pacote"] is not None:
+            eml = resultado["msg"].as_bytes()
+
+        fila.concluir(mensagem["id"], resultado, eml)
+
+    except relays.RelayIndisponivel as e:
+        desde = aguardando.setdefault(job_id, time.time())
+
+        if time.time() - desde < envio.MAX_ESPERA_SERVIDOR_S:
+            fila.adiar(mensagem["id"], time.time() + e.espera, "aguardando servidor")
+            return
+
+        aguardando.pop(job_id, None)
+        fila.abortar(
+            job_id,
+            f"Servidor SMTP indisponível há mais de "
+            f"{envio.MAX_ESPERA_SERVIDOR_S // 60} min: {e}"
+        )
+
+    except Exception as e:
+        fila.concluir(mensagem["id"], {"situacao": "falha", "erro": f"Erro no envio: {e}"})
+
+
+# --------------------------------------------------
+# FECHAMENTO DO JOB (RESUMO E LIMPEZA)
+# Resumo que falha fica em "resumos" (deste processo) com
+# o horário da próxima tentativa; enquanto isso o worker
+# segue alugando mensagens.
+# --------------------------------------------------
+def _fechar_job(job_id, execucao, resumos):
+    job = fila.carregar_job(job_id)
+    fechamento = {"job": job, "execucao": execucao, "antes": len(job["avisos"])}
+
+    try:
+        if job["cc_resumo"]:
+            if execucao is None:
+                execucao = fechamento["execucao"] = _iniciar(job)
+
+            if execucao is None:
+                job["resumo"] = "não enviado: sem conexão SMTP"
+                job["avisos"].append("Resumo para o CC não enviado: sem conexão SMTP")
+            else:
+                # pacote com os .eml de todos os workers do job
+                if execucao["pacote"] is not None:
+                    for assunto, eml in fila.emls(job_id):
+                        resumo_envio.adicionar_eml(execucao["pacote"], eml, assunto)
+
+                _tentar_resumo(fechamento, resumos)
+                return
+
+    except Exception as e:
+        job["resumo"] = f"não enviado: {e}"
+        job["avisos"].append(f"Resumo para o CC não enviado: {e}")
+
+    _concluir_fechamento(fechamento)
+
+
+def _tentar_resumo(fechamento, resumos):
+    job = fechamento["job"]
+
+    try:
+        espera = envio.enviar_resumo(job, fechamento["execucao"])
+    except Exception as e:
+        espera = None
+        job["resumo"] = f"não enviado: {e}"
+        job["avisos"].append(f"Resumo para o CC não enviado: {e}")
+
+    if espera is not None:
+        fechamento["quando"] = time.monotonic() + espera
+        resumos[job["id"]] = fechamento
+        return
+
+    _concluir_fechamento(fechamento)
+
+
+def _resumo_pronto(resumos):
+    agora = time.monotonic()
+    for job_id, fechamento in resumos.items():
+        if fechamento["quando"] <= agora:
+            return resumos.pop(job_id)
+    return None
+
+
+def _concluir_fechamento(fechamento):
+    job = fechamento["job"]
+
+    envio.confirmar_entrega(job)
+    _avisar_novos(job["id"], job["avisos"], fechamento["antes"])
+
+    if fechamento["execucao"] is not None:
+        envio.encerrar_execucao(fechamento["execucao"])
+
+    fila.finalizar(job["id"], job["resumo"])
+
+
+def _encerrar_ociosas(execucoes):
+    # job terminou (aqui ou em outro worker) ou parou de
+    # mandar mensagens para este processo
+    agora = time.monotonic()
+
+    for job_id, execucao in list(execucoes.items()):
+        if agora - execucao["usada_em"] > envio.OCIOSA_S:
+            envio.encerrar_execucao(execucoes.pop(job_id))
+
+
+# --------------------------------------------------
+# LOOP
+# --------------------------------------------------
+def trabalhar(indice=0):
+    nome = f"{socket.gethostname()}-{os.getpid()}-{indice}"
+
+    threading.Thread(
+        target=_batimentos,
+        args=(nome,),
+        name="automailer-heartbeat",
+        daemon=True
+    ).start()
+
+    execucoes = {}
+    aguardando = {}
+    resumos = {}
+    recolocado_em = 0
+
+    print(f"[{nome}] aguardando jobs em {fila.CAMINHO}")
+
+    while True:
+        if time.monotonic() - recolocado_em > RECOLOCAR_A_CADA_S:
+            recolocadas = fila.recolocar_vencidas()
+            if recolocadas:
+                print(f"[{nome}] {recolocadas} mensagem(ns) de workers parados de volta à fila")
+            recolocado_em = time.monotonic()
+
+        fechamento = _resumo_pronto(resumos)
+        if fechamento is not None:
+            _tentar_resumo(fechamento, resumos)
+            continue
+
+        job_id = fila.reivindicar_fechamento()
+        if job_id is not None:
+            _fechar_job(job_id, execucoes.pop(job_id, None), resumos)
+            continue
+
+        mensagem = fila.reivindicar(nome, _raias_liberadas())
+        if mensagem is None:
+            _encerrar_ociosas(execucoes)
+            time.sleep(ESPERA_VAZIA_S)
+            continue
+
+        _processar(mensagem, execucoes, aguardando)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processos", type=int, default=1)
+    args = parser.parse_args()
+
+    if not fila.ativa():
+        sys.exit("Defina AUTOMAILER_FILA com o caminho do arquivo da fila.")
+
+    if not CREDENCIAIS:
+        sys.exit("Defina AUTOMAILER_CREDENCIAIS com o arquivo de senhas das contas.")
+
+    if not envio.SEGREDO:
+        sys.exit("Defina AUTOMAILER_SEGREDO com a mesma chave usada pelo app.")
+
+    if args.processos == 1:
+        trabalhar()
+        return
+
+    processos = [
+        multiprocessing.Process(target=trabalhar, args=(i,), name=f"automailer-worker-{i}")
+        for i in range(args.processos)
+    ]
+
+    for processo in processos:
+        processo.start()
+
+    for processo in processos:
+        processo.join()
+
+
+if __name__ == "__main__":
+    main()